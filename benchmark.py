@@ -0,0 +1,367 @@
+"""
+Speed benchmarks for the simulator and the agents.
+Micro benchmarks time the hot pieces on their own (grid access, trail fading, worker observations, agent steps,
+Dyna-Q planning against models of several sizes, world resets), evaluation ones time greedy episodes one policy at a time
+and batched, end-to-end ones count training steps per second on presetWorld1 and seeded random worlds of a few sizes.
+
+Every run is saved as JSON under results/benchmarks/, and compared against results/benchmarks/baseline.json when there is one.
+Times are per operation, the best of several repeats so background noise only ever makes a result look slower.
+
+Usage:
+    python benchmark.py                    # run everything, compare against the baseline
+    python benchmark.py --save-baseline    # run everything and make it the new baseline
+    python benchmark.py --only dyna        # just the benchmarks whose name contains "dyna"
+    python benchmark.py --quick            # shorter repeats, for a rough look
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import timeit
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Add src directory to Python path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+import numpy as np
+from hex_grid import HexGrid
+from hex_grid_world import HexGridWorld
+from q_learning import QLearningAgent
+from dyna_q import DynaQAgent
+from sarsa import SARSAAgent
+from engine import Engine
+from ants import obsCount, decodeState
+from eval_service import compilePolicy, playEpisodes
+from batched_eval import BatchedEval
+
+BENCHMARK_DIR = os.path.join("results", "benchmarks")
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+
+# A benchmark's setup returns (function to time, operations per call)
+Setup = Callable[[], Tuple[Callable[[], None], int]]
+
+
+def random_coords(grid: HexGrid, n: int, rng: random.Random) -> List[Tuple[int, int, int]]:
+    """
+    n random normalized coords on the grid, spread over all three faces.
+    """
+    coords = grid.flatCoords()
+    return [coords[rng.randrange(len(coords))] for _ in range(n)]
+
+
+def random_states(n: int, rng: random.Random) -> list:
+    """
+    n random observation tuples, the keys the agents' tables are made of.
+    """
+    return [decodeState(rng.randrange(obsCount)) for _ in range(n)]
+
+
+# Micro benchmarks
+
+def grid_get_cell(size: int) -> Setup:
+    def setup():
+        grid = HexGrid(size, size, size)
+        coords = random_coords(grid, 1000, random.Random(0))
+        get = grid.getCell
+
+        def run():
+            for c in coords:
+                get(c)
+        return run, len(coords)
+    return setup
+
+
+def grid_set_cell(size: int) -> Setup:
+    def setup():
+        grid = HexGrid(size, size, size)
+        coords = random_coords(grid, 1000, random.Random(0))
+        set_cell = grid.setCell
+
+        def run():
+            for c in coords:
+                set_cell(c, "O")
+        return run, len(coords)
+    return setup
+
+
+def grid_fade_all_trails(size: int) -> Setup:
+    def setup():
+        grid = HexGrid(size, size, size)
+        # Trails on a tenth of the cells, the rest is the sweep over empty ones
+        for c in random_coords(grid, grid.cellCount() // 10, random.Random(0)):
+            grid.setTrail(c, 250)
+        return grid.fadeAllTrails, 1
+    return setup
+
+
+def worker_observe(has_food: bool) -> Setup:
+    def setup():
+        world = HexGridWorld(train=True, worldType=1)
+        worker = world.colony[1]
+        worker.hasFood = has_food
+
+        def run():
+            for _ in range(1000):
+                worker.observe()
+        return run, 1000
+    return setup
+
+
+def agent_step(agent_cls, agent_kwargs: Optional[dict] = None) -> Setup:
+    """
+    Agent step against a stand-in environment that hands back random states, so only the agent is timed.
+    """
+    def setup():
+        random.seed(0)
+        agent = agent_cls(epsilon=0.1, seed=0, **(agent_kwargs or {}))
+        states = random_states(1000, random.Random(0))
+        # Warm the table up so lookups hit as they do mid-training
+        for s in states:
+            for a in range(agent.n_actions):
+                agent.q_table[(s, a)] = 0.0
+        position = [0]
+
+        def env_step(action):
+            position[0] = (position[0] + 1) % len(states)
+            return 0, states[position[0]], False, False
+
+        def run():
+            step = agent.step
+            for s in states:
+                step(s, env_step)
+        return run, len(states)
+    return setup
+
+
+def dyna_planning(model_size: int, planning_steps: int = 10) -> Setup:
+    """
+    Dyna-Q steps with a model that already holds model_size transitions.
+    """
+    def setup():
+        random.seed(0)
+        rng = random.Random(0)
+        agent = DynaQAgent(planning_steps=planning_steps, epsilon=0.1)
+        # Real states only go up to obsCount, bigger models need more distinct keys, like extended observations would give
+        for i in range(model_size):
+            state = (decodeState(i % obsCount), i // obsCount)
+            agent.model[(state, i % agent.n_actions)] = (0, decodeState(rng.randrange(obsCount)))
+        states = random_states(100, rng)
+
+        def env_step(action):
+            return 0, states[0], False, False
+
+        def run():
+            for s in states:
+                agent.step(s, env_step)
+        return run, len(states)
+    return setup
+
+
+def world_reset(world_type: int, size: Optional[int] = None) -> Setup:
+    def setup():
+        world = HexGridWorld(train=True, worldType=world_type, x=size, y=size, z=size, seed=0)
+        return world.reset, 1
+    return setup
+
+
+# End-to-end benchmark, operations are environment steps
+
+def training_throughput(world_type: int, size: Optional[int] = None, episodes: int = 5, max_steps: int = 400) -> Setup:
+    def setup():
+        world = HexGridWorld(train=True, worldType=world_type, x=size, y=size, z=size, seed=0)
+        steps = [0]
+
+        # Every call starts a fresh agent from the same seeds, so every call plays the same episodes
+        # A learning agent carried over between calls would take fewer steps each time
+        def run():
+            random.seed(0)
+            world.rng = random.Random(0)
+            agent = QLearningAgent(epsilon=0.3)
+            engine = Engine(world, agent, maxSteps=max_steps).run(episodes)
+            steps[0] = sum(engine.lengths)
+
+        run()
+        return run, steps[0]
+    return setup
+
+
+# Greedy evaluation, operations are episodes
+
+def random_policies(n: int, rng: random.Random) -> list:
+    """
+    n compiled policies from random Q-tables over every observation.
+    """
+    policies = []
+    for _ in range(n):
+        q_table = {(decodeState(obs), a): rng.random() for obs in range(obsCount) for a in range(5)}
+        policies.append(compilePolicy(q_table))
+    return policies
+
+
+def serial_eval(policies: int, episodes: int, max_steps: int = 300) -> Setup:
+    def setup():
+        compiled = random_policies(policies, random.Random(0))
+
+        def run():
+            for policy in compiled:
+                playEpisodes(policy, 1, max_steps, episodes, 0)
+        return run, policies * episodes
+    return setup
+
+
+def batched_eval(policies: int, episodes: int, max_steps: int = 300) -> Setup:
+    def setup():
+        compiled = random_policies(policies, random.Random(0))
+        evaluator = BatchedEval(HexGridWorld(train=False, worldType=1))
+
+        def run():
+            evaluator.run(compiled, episodes=episodes, maxSteps=max_steps, seed=0)
+        return run, policies * episodes
+    return setup
+
+
+def benchmarks() -> Dict[str, Setup]:
+    """
+    Every benchmark by name.
+    """
+    out = {}
+    for size in (10, 50, 100):
+        out[f"grid_get_cell_{size}"] = grid_get_cell(size)
+        out[f"grid_set_cell_{size}"] = grid_set_cell(size)
+        out[f"grid_fade_all_trails_{size}"] = grid_fade_all_trails(size)
+    out["worker_observe"] = worker_observe(False)
+    out["worker_observe_has_food"] = worker_observe(True)
+    out["agent_step_q_learning"] = agent_step(QLearningAgent)
+    out["agent_step_sarsa"] = agent_step(SARSAAgent)
+    out["agent_step_dyna_q"] = agent_step(DynaQAgent, {"planning_steps": 5})
+    for model_size in (100, 1000, 10000):
+        out[f"dyna_planning_model_{model_size}"] = dyna_planning(model_size)
+    out["world_reset_preset1"] = world_reset(1)
+    for size in (20, 50, 100):
+        out[f"world_reset_random_{size}"] = world_reset(0, size)
+    out["eval_serial_8x10"] = serial_eval(8, 10)
+    out["eval_batched_8x10"] = batched_eval(8, 10)
+    out["eval_batched_64x50"] = batched_eval(64, 50)
+    out["steps_per_s_preset1"] = training_throughput(1)
+    for size in (20, 50, 100):
+        out[f"steps_per_s_random_{size}"] = training_throughput(0, size)
+    return out
+
+
+def measure(setup: Setup, repeat: int = 5, min_time: float = 0.2) -> dict:
+    """
+    Best time per operation over several repeats, each long enough to swamp timer overhead.
+    """
+    fn, ops = setup()
+    timer = timeit.Timer(fn)
+    number, _ = timer.autorange()
+    # Scale the autorange count to the target length of a repeat
+    number = max(1, int(number * min_time / 0.2))
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    per_op = best / max(ops, 1)
+    return {"per_op_s": per_op, "ops_per_s": 1.0 / per_op if per_op > 0 else float("inf"), "ops": ops, "number": number, "repeat": repeat}
+
+
+def machine_info() -> dict:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float = 0.2) -> List[str]:
+    """
+    Print each benchmark against the baseline, returns the names that got slower than tolerance allows.
+    Ratios are current time over baseline time, above 1 is slower.
+    """
+    regressions = []
+    print(f"\n{'benchmark':<32}{'baseline':>14}{'current':>14}{'ratio':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<32}{'-':>14}{format_time(result['per_op_s']):>14}{'new':>8}")
+            continue
+        ratio = result["per_op_s"] / base["per_op_s"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  slower"
+            regressions.append(name)
+        elif ratio < 1 / (1 + tolerance):
+            flag = "  faster"
+        print(f"{name:<32}{format_time(base['per_op_s']):>14}{format_time(result['per_op_s']):>14}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f} {unit}"
+    return f"{seconds / 1e-9:.1f} ns"
+
+
+def run(
+    only: Optional[str] = None,
+    quick: bool = False,
+    save_baseline: bool = False,
+    baseline_path: str = BASELINE_PATH,
+    tolerance: float = 0.2,
+) -> Tuple[dict, List[str]]:
+    """
+    Run the selected benchmarks, save them, and compare against the baseline.
+    Returns (saved report, names that regressed).
+    """
+    repeat, min_time = (3, 0.05) if quick else (5, 0.2)
+    results = {}
+    for name, setup in benchmarks().items():
+        if only is not None and only not in name:
+            continue
+        results[name] = measure(setup, repeat=repeat, min_time=min_time)
+        print(f"{name:<32}{format_time(results[name]['per_op_s']):>14} per op, {results[name]['ops_per_s']:>14,.0f} ops/s")
+
+    report = {"created": datetime.now().isoformat(timespec="seconds"), "quick": quick, "machine": machine_info(), "results": results}
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    path = os.path.join(BENCHMARK_DIR, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved: {path}")
+
+    regressions = []
+    if save_baseline:
+        with open(baseline_path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved: {baseline_path}")
+    elif os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+        if baseline["machine"] != report["machine"]:
+            print("Baseline was recorded on a different machine or setup, ratios may not mean much")
+        regressions = compare(results, baseline["results"], tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) more than {tolerance:.0%} slower than the baseline: {', '.join(regressions)}")
+    else:
+        print(f"No baseline at {baseline_path}, rerun with --save-baseline to make one")
+    return report, regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulator and agent speed benchmarks")
+    parser.add_argument("--only", help="only run benchmarks whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="shorter repeats")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="slowdown allowed before a benchmark counts as a regression")
+    args = parser.parse_args()
+    _, regressions = run(args.only, args.quick, args.save_baseline, args.baseline, args.tolerance)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
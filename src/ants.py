@@ -7,10 +7,29 @@ Parent ant class plus queen and worker.
 
 # Imports
 from hex_grid import HexGrid
-from random import randint
+import random
 from q_learning import QLearningAgent
 
 
+# Observation encoding
+# A worker's state is (hasFood, cell, cell, cell) where each seen cell is one of these six types
+# W and V are folded into O by observe, so they never show up here
+obsCells = "EOFQST"
+obsIndex = {cell: i for i, cell in enumerate(obsCells)}
+obsCount = 2 * len(obsCells) ** 3 # Number of distinct integer observations
+
+# Pack a state tuple into one int, 0 to obsCount - 1
+def encodeState(state: tuple[bool, str, str, str]) -> int:
+    return ((int(state[0]) * 6 + obsIndex[state[1]]) * 6 + obsIndex[state[2]]) * 6 + obsIndex[state[3]]
+
+# Unpack an int from encodeState back into a state tuple
+def decodeState(obs: int) -> tuple[bool, str, str, str]:
+    obs, c3 = divmod(obs, 6)
+    obs, c2 = divmod(obs, 6)
+    hasFood, c1 = divmod(obs, 6)
+    return (bool(hasFood), obsCells[c1], obsCells[c2], obsCells[c3])
+
+
 # Parent ant class
 class Ant(object):
     grid: HexGrid # The grid world it's in
@@ -19,6 +38,7 @@ class Ant(object):
     y: int # Y position
     z: int # Z position
     age: int = 0 # Steps taken, killed by world manager after a while
+    rng = random # Random source, the world's own when it's seeded, otherwise the global one
     
     # Constant array
     # For each direction, the coord of the cell it's facing is its pos plus the corresponding one of these
@@ -50,12 +70,13 @@ class Queen(Ant):
     # Action
     def act(self):
         if self.food > 0: # Attempt to spend a food to spawn a worker in a random adjacent cell if it's empty
-            spawn = randint(0, 5)
+            spawn = self.rng.randint(0, 5)
             cSpawn = self.visionOffsets[spawn]
             if self.grid.getCell(cSpawn) == "E":
                 self.dir = spawn
                 self.colony.append(Worker(self.grid, x = cSpawn[0], y = cSpawn[1], z = cSpawn[2], dir = (spawn + 3) % 6))
                 self.colony[-1].queen = self
+                self.colony[-1].rng = self.rng
                 self.grid.setCell(cSpawn, "W")
                 self.food -= 1
 
@@ -65,12 +86,19 @@ class Worker(Ant):
     queen: Queen = None
     q_agent: QLearningAgent = None
 
+    # Action
+    # An action passed in from outside is taken as is, otherwise the Q-agent picks and learns
     def act(self, action: int = None) -> tuple[tuple[bool, str, str, str], int, int, tuple[bool, str, str, str]]:
         self.age += 1
 
         vision, visionCoords = self.observe()
         state = (self.hasFood, vision[0], vision[1], vision[2])
 
+        if action is not None:
+            reward = self._execute_action(action, visionCoords, vision)
+            visionNew, _ = self.observe()
+            return state, action, reward, (self.hasFood, visionNew[0], visionNew[1], visionNew[2])
+
         # Q-learning agent must exist for worker to act
         assert self.q_agent is not None, "Worker requires Q-learning agent to act"
 
@@ -151,7 +179,7 @@ class Worker(Ant):
             for i in range(3):
                 if vCells[i] == "F":
                     foodCells.append(i)
-            cFood = vCoords[foodCells[randint(0, len(foodCells) - 1)]]
+            cFood = vCoords[foodCells[self.rng.randint(0, len(foodCells) - 1)]]
             self.grid.setCell(cFood, "E")
             self.hasFood = True
             self.grid.addTrail(cFood)
@@ -168,6 +196,7 @@ class Worker(Ant):
             if vCoords[i] == cQueen:
                 self.queen.food += 1
                 self.hasFood = False
+                self.grid.markDirty((self.x,self.y,self.z))
                 return 10
         return -1
 
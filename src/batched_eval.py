@@ -0,0 +1,163 @@
+"""
+Batched greedy evaluation.
+Plays many frozen policies at once: every (policy, episode) pair gets a slot with its own copy of the cells and trails
+as flat NumPy arrays, and every step moves all slots together, following the same rules as Worker in a full world (train=False).
+Observation, action choice, the action itself and trail fading are all whole-array operations, so the cost of a step
+hardly depends on the number of slots, and a whole sweep's policies evaluate in about the time of a few single evaluations.
+
+It covers worlds where one worker does everything: a queen without food, so it never spawns, and one worker, like presetWorld1.
+Every slot starts from the same snapshot of the world, taken after a reset.
+Policies are the compiled ones from eval_service.compilePolicy, ties are broken uniformly at random per slot.
+
+"""
+
+# Imports
+import numpy as np
+from ants import Ant, obsCells, obsCount
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from hex_grid_world import HexGridWorld
+
+# Observation codes, in ants.obsCells order
+E, O, F, Q, S, T = (obsCells.index(c) for c in "EOFQST")
+cellE, cellF, cellQ, cellW = (ord(c) for c in "EFQW")
+
+
+# Boolean (policies, obsCount, actions) array of each policy's best actions
+def policyMasks(policies: list, nActions: int = 5) -> np.ndarray:
+    masks = np.zeros((len(policies), obsCount, nActions), dtype = bool)
+    for p, policy in enumerate(policies):
+        for obs, best in enumerate(policy):
+            masks[p, obs, list(best)] = True
+    return masks
+
+
+# Many policies, many episodes, one world
+class BatchedEval(object):
+    cells: np.ndarray # Flat cells of the snapshot as ASCII codes
+    trails: np.ndarray # Flat trails of the snapshot
+    neighbours: np.ndarray # (cells, 6) flat index of the cell in each direction, -1 off the grid
+    queenDist: np.ndarray # Distance of every cell to the queen
+    queen: int # Flat index of the queen
+    start: tuple[int, int, bool] # Worker's flat index, direction and whether it has food
+
+    # Initialize from a world just after a reset
+    def __init__(self, world: "HexGridWorld"):
+        grid = world.grid
+        assert len(world.colony) == 2 and world.colony[0].food == 0, "Batched evaluation needs a queen without food and exactly one worker"
+        queen, worker = world.colony
+        coords = grid.flatCoords()
+        self.cells = np.frombuffer("".join(grid.flatCells()).encode("ascii"), dtype = np.uint8).copy()
+        self.trails = np.array(grid.flatTrails(), dtype = np.int16)
+        self.neighbours = np.full((len(coords), 6), -1, dtype = np.int64)
+        for i, c in enumerate(coords):
+            for d, offset in enumerate(Ant.visionOffsets):
+                n = grid.add(c, offset)
+                if n[0] < grid.xR and n[1] < grid.yR and n[2] < grid.zR:
+                    self.neighbours[i, d] = grid.flatIndex(n)
+        cQueen = (queen.x, queen.y, queen.z)
+        self.queenDist = np.array([grid.distance(c, cQueen) for c in coords], dtype = np.int64)
+        self.queen = grid.flatIndex(cQueen)
+        self.start = (grid.flatIndex((worker.x, worker.y, worker.z)), worker.dir, worker.hasFood)
+
+    # Play every policy for `episodes` episodes
+    # Returns {"rewards", "lengths", "deliveries"} as (policies, episodes) arrays, and "ties", the tie breaks per policy
+    def run(self, policies: list, episodes: int = 50, maxSteps: int = 1000, seed: int = None, nActions: int = 5) -> dict:
+        masks = policyMasks(policies, nActions)
+        nPolicies = len(policies)
+        slots = nPolicies * episodes
+        slotPolicy = np.repeat(np.arange(nPolicies), episodes)
+        rng = np.random.default_rng(seed)
+        rows = np.arange(slots)
+
+        cells = np.tile(self.cells, (slots, 1))
+        trails = np.tile(self.trails, (slots, 1))
+        pos = np.full(slots, self.start[0], dtype = np.int64)
+        dir = np.full(slots, self.start[1], dtype = np.int64)
+        hasFood = np.full(slots, self.start[2], dtype = bool)
+        active = np.ones(slots, dtype = bool)
+        rewards = np.zeros(slots, dtype = np.int64)
+        lengths = np.zeros(slots, dtype = np.int64)
+        deliveries = np.zeros(slots, dtype = np.int64)
+        ties = np.zeros(slots, dtype = np.int64)
+
+        for _ in range(maxSteps):
+            if not active.any():
+                break
+
+            # Observe, same as Worker.observe: left, ahead, right
+            sight = np.stack([(dir - 1) % 6, dir, (dir + 1) % 6], axis = 1)
+            seen = self.neighbours[pos[:, None], sight]
+            onGrid = seen >= 0
+            raw = np.where(onGrid, cells[rows[:, None], np.maximum(seen, 0)], 0)
+            code = np.full((slots, 3), O, dtype = np.int64)
+            code[raw == cellE] = E
+            code[(raw == cellF) & ~hasFood[:, None]] = F
+            code[(raw == cellQ) & hasFood[:, None]] = Q
+            # Carrying food: empty cells closer to the queen are shown as S
+            closer = self.queenDist[np.maximum(seen, 0)] < self.queenDist[pos][:, None]
+            code[(code == E) & hasFood[:, None] & closer] = S
+            # Not carrying: empty cells with at least half the strongest trail in sight are shown as T
+            seenTrails = np.where(code == E, trails[rows[:, None], np.maximum(seen, 0)], -1)
+            strongest = seenTrails.max(axis = 1)
+            code[~hasFood[:, None] & (seenTrails > 0) & (seenTrails >= strongest[:, None] / 2)] = T
+            obs = ((hasFood * 6 + code[:, 0]) * 6 + code[:, 1]) * 6 + code[:, 2]
+
+            # Greedy action, ties broken uniformly
+            best = masks[slotPolicy, obs]
+            tied = best.sum(axis = 1) > 1
+            ties += tied & active
+            draw = rng.random((slots, nActions))
+            draw[~best] = -1
+            action = draw.argmax(axis = 1)
+
+            reward = np.full(slots, -1, dtype = np.int64)
+
+            # Moves: turn, then step into the cell if it's empty
+            moving = active & (action <= 2)
+            dir[moving] = (dir[moving] + action[moving] - 1) % 6
+            target = seen[rows, np.minimum(action, 2)]
+            moved = moving & (target >= 0) & (cells[rows, np.maximum(target, 0)] == cellE)
+            m = np.nonzero(moved)[0]
+            cells[m, target[m]] = cellW
+            cells[m, pos[m]] = cellE
+            carrying = m[hasFood[m]]
+            trails[carrying, target[carrying]] = 250
+            pos[m] = target[m]
+            targetCode = code[rows, np.minimum(action, 2)]
+            reward[moved] = np.where((targetCode[moved] == T) | (targetCode[moved] == S), 1, 0)
+
+            # Pick up food from a random food cell in sight
+            foodSeen = code == F
+            picking = np.nonzero(active & (action == 3) & ~hasFood & foodSeen.any(axis = 1))[0]
+            if len(picking) > 0:
+                pick = rng.random((len(picking), 3))
+                pick[~foodSeen[picking]] = -1
+                food = seen[picking, pick.argmax(axis = 1)]
+                cells[picking, food] = cellE
+                hasFood[picking] = True
+                trails[picking, food] = 250
+                trails[picking, pos[picking]] = 250
+                dir[picking] = (dir[picking] + 3) % 6
+                reward[picking] = 3
+
+            # Give food to the queen in sight, which ends the episode
+            giving = active & (action == 4) & hasFood & (seen == self.queen).any(axis = 1)
+            hasFood[giving] = False
+            reward[giving] = 10
+
+            # Fade every trail, then book the step
+            np.subtract(trails, 1, out = trails, where = trails > 0)
+            rewards[active] += reward[active]
+            lengths[active] += 1
+            deliveries[giving] += 1
+            active &= ~giving
+
+        shape = (nPolicies, episodes)
+        return {
+            "rewards": rewards.reshape(shape),
+            "lengths": lengths.reshape(shape),
+            "deliveries": deliveries.reshape(shape),
+            "ties": ties.reshape(shape).sum(axis = 1),
+        }
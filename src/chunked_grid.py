@@ -0,0 +1,188 @@
+"""
+Chunked hex grid.
+A HexGrid for worlds far too big to store, where the ants only ever see a small part.
+Each face of the grid is split into square chunks whose cells are generated from (seed, face, chunk) the first time they're read,
+so untouched chunks cost nothing and a chunk can be dropped and regenerated at any time.
+Anything written through the setters is kept separately and always wins over the generated cells,
+and trails only exist where something laid one.
+
+"""
+
+# Imports
+from collections import OrderedDict
+from hex_grid import HexGrid
+import numpy as np
+
+
+# Hex grid generated on demand
+class ChunkedHexGrid(HexGrid):
+    seed: int # Decides every generated cell
+    chunkSize: int # Chunks are chunkSize by chunkSize cells of one face
+    maxChunks: int # Most chunks kept in memory, least recently used ones are dropped past this
+    maxRockSize: int # Biggest rock cluster, at most half a chunk so clusters only reach neighbouring chunks
+    chunks: OrderedDict # (face, chunk a, chunk b) -> generated cells as a string, in least recently used order
+    edits: dict # Coord -> cell for everything set since generation
+    trailMap: dict # Coord -> trail value, only for cells with a trail
+    chunksGenerated: int = 0
+    evictions: int = 0
+
+    # Initialize
+    # The memory budget is in bytes of generated cells, one per cell
+    # Rock clusters don't grow with the world like in randomWorld, a huge map would be nothing but rock
+    def __init__(self, xR: int, yR: int, zR: int, seed: int, chunkSize: int = 64, memoryBudget: int = 16 << 20, maxRockSize: int = 3):
+        self.xR = xR
+        self.yR = yR
+        self.zR = zR
+        self.seed = seed
+        self.chunkSize = chunkSize
+        self.maxChunks = max(memoryBudget // (chunkSize * chunkSize), 1)
+        self.maxRockSize = max(min(maxRockSize, chunkSize // 2), 1)
+        self.chunkSpan = max(xR, yR, zR) // chunkSize + 1
+        self.chunks = OrderedDict()
+        self.edits = {}
+        self.trailMap = {}
+        # Chunk local positions, shared by every chunk
+        a, b = np.divmod(np.arange(chunkSize * chunkSize), chunkSize)
+        self.localA = a
+        self.localB = b
+
+    # Face and in-face position of a normalized coord
+    # Face 0 is XY (a=x, b=y), face 1 is YZ (a=y, b=z), face 2 is ZX (a=z, b=x), edges go to the first face that has them
+    def facePosition(self, c: tuple[int, int, int]) -> tuple[int, int, int]:
+        if c[2] == 0:
+            return 0, c[0], c[1]
+        if c[0] == 0:
+            return 1, c[1], c[2]
+        return 2, c[2], c[0]
+
+    # Generated cell at a coord, making its chunk if needed
+    def generatedCell(self, c: tuple[int, int, int]) -> str:
+        face, a, b = self.facePosition(c)
+        size = self.chunkSize
+        key = (face, a // size, b // size)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.generateChunk(key)
+            self.chunks[key] = chunk
+            if len(self.chunks) > self.maxChunks:
+                self.chunks.popitem(last = False)
+                self.evictions += 1
+        else:
+            self.chunks.move_to_end(key)
+        return chunk[(a % size) * size + b % size]
+
+    # Random draws for one chunk, the same every time it's asked for
+    # 1 in 30 cells each get food, a rock, or the centre of a rock cluster, like randomWorld
+    def chunkDraws(self, key: tuple[int, int, int]) -> tuple[np.ndarray, np.ndarray]:
+        rng = np.random.default_rng([self.seed, key[0], key[1], key[2]])
+        gen = rng.integers(0, 30, size = self.chunkSize * self.chunkSize)
+        scales = rng.integers(1, self.maxRockSize + 1, size = self.chunkSize * self.chunkSize)
+        return gen, scales
+
+    # Write order of a chunk's first cell, any fixed order of chunks works as long as every chunk uses the same one
+    def chunkRank(self, ca: int, cb: int) -> int:
+        return (ca * self.chunkSpan + cb) * self.chunkSize * self.chunkSize
+
+    # Generate a chunk's cells
+    # Later writes win, ordered by chunk then by cell, so clusters spilling over from neighbours land the same from either side
+    def generateChunk(self, key: tuple[int, int, int]) -> str:
+        self.chunksGenerated += 1
+        face, ca, cb = key
+        size = self.chunkSize
+        count = size * size
+        cellA = ca * size + self.localA
+        cellB = cb * size + self.localB
+        gen, _ = self.chunkDraws(key)
+
+        # Single food and rocks from this chunk's own draws
+        rank = self.chunkRank(ca, cb)
+        order = np.full(count, -1, dtype = np.int64)
+        values = np.full(count, ord("E"), dtype = np.uint8)
+        single = gen < 2
+        order[single] = rank + np.nonzero(single)[0]
+        values[gen == 0] = ord("F")
+        values[gen == 1] = ord("O")
+
+        # Rock clusters centred in this chunk or a neighbour on the same face
+        for na in (ca - 1, ca, ca + 1):
+            for nb in (cb - 1, cb, cb + 1):
+                if na < 0 or nb < 0:
+                    continue
+                nGen, nScales = self.chunkDraws((face, na, nb))
+                centres = np.nonzero(nGen == 2)[0]
+                if len(centres) == 0:
+                    continue
+                dA = cellA[None, :] - (na * size + self.localA[centres])[:, None]
+                dB = cellB[None, :] - (nb * size + self.localB[centres])[:, None]
+                # Hex distance between (a, b, 0) coords
+                dist = np.maximum(np.maximum(dA, dB), 0) - np.minimum(np.minimum(dA, dB), 0)
+                inside = dist < nScales[centres][:, None]
+                centreOrder = np.where(inside, (self.chunkRank(na, nb) + centres)[:, None], -1).max(axis = 0)
+                newer = centreOrder > order
+                order[newer] = centreOrder[newer]
+                values[newer] = ord("O")
+
+        # Clear the space around the queen, same as randomWorld
+        if ca == 0 and cb == 0:
+            values[np.maximum(cellA, cellB) <= 3] = ord("E")
+        return values.tobytes().decode("ascii")
+
+    # Getter
+    def getCell(self, c: tuple[int, int, int]) -> str:
+        if c[0] >= self.xR or c[1] >= self.yR or c[2] >= self.zR:
+            return "V" # Void, off the grid
+        cell = self.edits.get(c)
+        if cell is not None:
+            return cell
+        return self.generatedCell(c)
+
+    # Getter
+    def getTrail(self, c: tuple[int, int, int]) -> int:
+        return self.trailMap.get(c, 0)
+
+    # Setter
+    def setCell(self, c: tuple[int, int, int], new: str):
+        self.edits[c] = new
+        if self.dirty is not None:
+            self.dirty.add(c)
+
+    # Setter
+    def setTrail(self, c: tuple[int, int, int], new: int):
+        if new > 0:
+            self.trailMap[c] = new
+        else:
+            self.trailMap.pop(c, None)
+        if self.dirty is not None:
+            self.dirty.add(c)
+
+    # Setter with default value for new trails
+    def addTrail(self, c: tuple[int, int, int]):
+        self.setTrail(c, 250)
+
+    # Reduce the strength of the trail at a cell by 1
+    def fadeTrail(self, c: tuple[int, int, int]):
+        if c in self.trailMap:
+            self.setTrail(c, self.trailMap[c] - 1)
+
+    # Fade trail over whole grid, which only means the cells that have one
+    def fadeAllTrails(self):
+        for c in list(self.trailMap):
+            self.fadeTrail(c)
+
+    # Flat views read every cell through the getters, only sensible for small grids
+    def flatCells(self) -> list[str]:
+        return [self.getCell(c) for c in self.flatCoords()]
+
+    def flatTrails(self) -> list[int]:
+        return [self.getTrail(c) for c in self.flatCoords()]
+
+    # Loading flat values stores them all as edits
+    def loadFlat(self, cells: list, trails: list = None):
+        for i, c in enumerate(self.flatCoords()):
+            self.edits[c] = cells[i]
+            if trails is not None and trails[i] > 0:
+                self.trailMap[c] = trails[i]
+
+    # Chunks currently in memory
+    def loadedChunks(self) -> int:
+        return len(self.chunks)
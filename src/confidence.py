@@ -0,0 +1,52 @@
+"""
+Aggregation of repeated runs.
+Runs of the same experiment with different seeds are stacked into one (runs, episodes) array,
+then summarized per episode into a mean and a bootstrap confidence band, all at once with NumPy.
+
+"""
+
+import numpy as np
+from typing import Optional, Tuple
+
+
+def stack_runs(runs) -> np.ndarray:
+    """
+    Stack per-seed series into a (runs, episodes) float array, cutting them to the shortest one.
+    """
+    length = min(len(run) for run in runs)
+    return np.array([run[:length] for run in runs], dtype=float)
+
+
+def rolling_mean(runs: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling mean along the last axis, only over full windows, like np.convolve(mode="valid") on every run.
+    """
+    runs = np.asarray(runs, dtype=float)
+    if runs.shape[-1] < window:
+        return runs[..., :0]
+    sums = np.cumsum(runs, axis=-1)
+    sums = np.concatenate([np.zeros(runs.shape[:-1] + (1,)), sums], axis=-1)
+    return (sums[..., window:] - sums[..., :-window]) / window
+
+
+def bootstrap_ci(
+    runs: np.ndarray,
+    n_boot: int = 1000,
+    ci: float = 0.95,
+    seed: Optional[int] = None,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Mean over the first axis and a percentile bootstrap confidence interval around it.
+    Every resample draws whole runs with replacement, all resamples are taken in one gather.
+    Returns (mean, low, high), each shaped like one run. With a single run the band is just the run.
+    """
+    runs = np.asarray(runs, dtype=float)
+    mean = runs.mean(axis=0)
+    n = runs.shape[0]
+    if n < 2:
+        return mean, mean.copy(), mean.copy()
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, n, size=(n_boot, n))
+    resampled = runs[picks].mean(axis=1)
+    low, high = np.percentile(resampled, [(1 - ci) / 2 * 100, (1 + ci) / 2 * 100], axis=0)
+    return mean, low, high
@@ -0,0 +1,223 @@
+"""
+Exact dynamic programming solver.
+Enumerates every state a lone worker can reach in a world, as (position, direction, hasFood, food cell taken),
+by running the real Worker actions from each one, then solves the resulting MDP with vectorized value iteration.
+
+The state is exact for training (train=True): only the worker acts, trails never fade, the only trails it lays are while
+carrying, when it doesn't see them anyway, and the episode ends on the one delivery. Picking between several food cells in
+sight is random in Worker, so those actions get one outcome per food cell.
+In evaluation trails fade every step, so there the solution is a close reference rather than exact.
+
+The solution gives the optimal values and policy over world states, the expected undiscounted return of that policy
+for regret baselines, and a Q-table over the agents' observations for warm starts.
+An observation can stand for several world states, so the best an agent can do is at most the optimum here.
+
+"""
+
+# Imports
+import ants
+from hex_grid import HexGrid
+import numpy as np
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from hex_grid_world import HexGridWorld
+
+
+# Stand-in random source making Worker.pickUpFood take a given one of the food cells in sight
+class ForcedChoice(object):
+    # Initialize
+    def __init__(self, index: int):
+        self.index = index
+
+    def randint(self, a: int, b: int) -> int:
+        return a + self.index
+
+
+# Solver for the world a lone worker sees
+class DPSolver(object):
+    discount: float
+    nActions: int
+    grid: HexGrid # Copy of the world's map without the worker, states are set up on it and put back
+    queen: ants.Queen
+    worker: ants.Worker
+    states: list # (coord, dir, hasFood, coord of the food taken or None)
+    index: dict # State -> position in states
+    observations: list # Worker observation tuple of every state, the agents' state key
+    start: int # State the world starts in
+    nextState: np.ndarray # (states, actions, outcomes) next state index
+    probability: np.ndarray # (states, actions, outcomes) outcome probability, 0 for padding
+    reward: np.ndarray # (states, actions) expected reward
+    continues: np.ndarray # (states, actions, outcomes) 0 where the outcome ends the episode
+    values: np.ndarray = None # Optimal value of every state
+    qValues: np.ndarray = None # Optimal (states, actions) values
+    policy: np.ndarray = None # Best action of every state
+    iterations: int = 0
+
+    # Initialize from a world just after a reset, with one worker and a queen without food
+    def __init__(self, world: "HexGridWorld", discount: float = 0.9, nActions: int = 5):
+        assert len(world.colony) == 2 and world.colony[0].food == 0, "The solver needs a queen without food and exactly one worker"
+        self.discount = discount
+        self.nActions = nActions
+        queen, worker = world.colony
+        self.grid = HexGrid(world.xR, world.yR, world.zR)
+        self.grid.loadFlat(world.grid.flatCells(), world.grid.flatTrails())
+        cStart = (worker.x, worker.y, worker.z)
+        self.grid.setCell(cStart, "E")
+        self.queen = ants.Queen(self.grid, x = queen.x, y = queen.y, z = queen.z)
+        self.worker = ants.Worker(self.grid)
+        self.worker.queen = self.queen
+        self.states = []
+        self.index = {}
+        self.observations = []
+        self.start = self.explore((cStart, worker.dir, worker.hasFood, None))
+
+    # Put a state on the grid, returns the coords whose cells and trails it may change, with their current values
+    def place(self, state: tuple) -> list:
+        c, dir, hasFood, taken = state
+        grid = self.grid
+        if taken is not None:
+            grid.setCell(taken, "E")
+        grid.setCell(c, "W")
+        worker = self.worker
+        worker.x, worker.y, worker.z = c
+        worker.dir = dir
+        worker.hasFood = hasFood
+        self.queen.food = 0
+        _, coords = worker.observe()
+        touched = [c] + [v for v in coords if grid.getCell(v) != "V"]
+        return [(v, grid.getCell(v), grid.getTrail(v)) for v in touched]
+
+    # Take a state back off the grid
+    def remove(self, state: tuple, saved: list):
+        self.restore(saved)
+        c, _, _, taken = state
+        self.grid.setCell(c, "E")
+        if taken is not None:
+            self.grid.setCell(taken, "F")
+
+    def restore(self, saved: list):
+        for v, cell, trail in saved:
+            self.grid.setCell(v, cell)
+            self.grid.setTrail(v, trail)
+
+    # Every outcome of an action as (probability, next state, reward, ends episode)
+    def outcomes(self, state: tuple, action: int) -> list:
+        c, dir, hasFood, taken = state
+        worker = self.worker
+        saved = self.place(state)
+        vision, _ = worker.observe()
+        choices = vision.count("F") if action == 3 and not hasFood else 1
+        out = []
+        for choice in range(max(choices, 1)):
+            self.restore(saved)
+            worker.x, worker.y, worker.z = c
+            worker.dir = dir
+            worker.hasFood = hasFood
+            self.queen.food = 0
+            worker.rng = ForcedChoice(choice)
+            vision, coords = worker.observe()
+            reward = worker._execute_action(action, coords, vision)
+            newTaken = taken
+            if worker.hasFood and not hasFood:
+                newTaken = next(v for v, cell, _ in saved if cell == "F" and self.grid.getCell(v) == "E")
+            nextState = ((worker.x, worker.y, worker.z), worker.dir, worker.hasFood, newTaken)
+            out.append((1 / max(choices, 1), nextState, reward, self.queen.food > 0))
+        self.remove(state, saved)
+        return out
+
+    def observe(self, state: tuple) -> tuple[bool, str, str, str]:
+        saved = self.place(state)
+        vision, _ = self.worker.observe()
+        self.remove(state, saved)
+        return (state[2], vision[0], vision[1], vision[2])
+
+    # Breadth first search over every state reachable from the start, building the transition arrays
+    def explore(self, start: tuple) -> int:
+        self.index[start] = 0
+        self.states.append(start)
+        transitions = []
+        i = 0
+        while i < len(self.states):
+            state = self.states[i]
+            self.observations.append(self.observe(state))
+            row = []
+            for action in range(self.nActions):
+                outs = self.outcomes(state, action)
+                for _, nextState, _, done in outs:
+                    if not done and nextState not in self.index:
+                        self.index[nextState] = len(self.states)
+                        self.states.append(nextState)
+                row.append(outs)
+            transitions.append(row)
+            i += 1
+
+        count = len(self.states)
+        width = max(len(outs) for row in transitions for outs in row)
+        self.nextState = np.zeros((count, self.nActions, width), dtype = np.int64)
+        self.probability = np.zeros((count, self.nActions, width))
+        self.continues = np.zeros((count, self.nActions, width))
+        self.reward = np.zeros((count, self.nActions))
+        for s, row in enumerate(transitions):
+            for a, outs in enumerate(row):
+                for k, (p, nextState, reward, done) in enumerate(outs):
+                    self.probability[s, a, k] = p
+                    self.reward[s, a] += p * reward
+                    if not done:
+                        self.nextState[s, a, k] = self.index[nextState]
+                        self.continues[s, a, k] = 1
+        return 0
+
+    # Value iteration until no value moves by more than tol
+    def solve(self, tol: float = 1e-9, maxIterations: int = 100000) -> "DPSolver":
+        weight = self.probability * self.continues * self.discount
+        values = np.zeros(len(self.states))
+        for iteration in range(maxIterations):
+            qValues = self.reward + (weight * values[self.nextState]).sum(axis = 2)
+            newValues = qValues.max(axis = 1)
+            converged = np.abs(newValues - values).max() < tol
+            values = newValues
+            if converged:
+                break
+        self.iterations = iteration + 1
+        self.values = values
+        self.qValues = qValues
+        self.policy = qValues.argmax(axis = 1)
+        return self
+
+    # Expected undiscounted reward, steps and deliveries of the optimal policy from the start within maxSteps
+    def expectedReturn(self, maxSteps: int = 1000) -> tuple[float, float, float]:
+        rows = np.arange(len(self.states))
+        nextState = self.nextState[rows, self.policy]
+        probability = self.probability[rows, self.policy]
+        continues = self.continues[rows, self.policy]
+        reward = self.reward[rows, self.policy]
+        stay = probability * continues
+        ends = (probability * (1 - continues)).sum(axis = 1)
+        total = np.zeros(len(self.states))
+        steps = np.zeros(len(self.states))
+        delivered = np.zeros(len(self.states))
+        # Work back from the last step, each pass adds one step of horizon
+        for _ in range(maxSteps):
+            total = reward + (stay * total[nextState]).sum(axis = 1)
+            steps = 1 + (stay * steps[nextState]).sum(axis = 1)
+            delivered = ends + (stay * delivered[nextState]).sum(axis = 1)
+        return float(total[self.start]), float(steps[self.start]), float(delivered[self.start])
+
+    # Optimal action values over the agents' observations, each the mean over the world states showing that observation
+    def qTable(self) -> dict:
+        sums = {}
+        counts = {}
+        for s, obs in enumerate(self.observations):
+            counts[obs] = counts.get(obs, 0) + 1
+            for a in range(self.nActions):
+                sums[(obs, a)] = sums.get((obs, a), 0.0) + float(self.qValues[s, a])
+        return {(obs, a): value / counts[obs] for (obs, a), value in sums.items()}
+
+    # Start a tabular agent from the solution's Q-table
+    def warmStart(self, agent):
+        table = self.qTable()
+        interner = getattr(agent, "interner", None)
+        if interner is not None:
+            table = interner.internTable(table)
+        agent.q_table = table
@@ -3,7 +3,8 @@ Dyna-Q agent for ant simulation.
 Builds on Q-learning by adding model-based planning updates.
 """
 
-from random import choice, random
+from random import choice
+from time import perf_counter
 from typing import Dict, Tuple, Any, Optional
 
 from q_learning import QLearningAgent
@@ -20,14 +21,6 @@ class DynaQAgent(QLearningAgent):
         self.planning_steps = planning_steps
         self.model: Dict[Tuple[Any, int], Tuple[float, Tuple]] = {}
 
-    def _select_action(self, state: Tuple) -> int:
-        if random() < self.epsilon:
-            return choice(range(self.n_actions))
-        q_values = [self.q_table.get((state, a), 0.0) for a in range(self.n_actions)]
-        max_q = max(q_values)
-        best_actions = [a for a, q in enumerate(q_values) if q == max_q]
-        return choice(best_actions)
-
     def _update_q(self, state: Tuple, action: int, reward: float, next_state: Tuple, terminated: bool = False, truncated: bool = False) -> None:
         current_q = self.q_table.get((state, action), 0.0)
         if terminated or truncated:
@@ -38,15 +31,12 @@ class DynaQAgent(QLearningAgent):
         td_error = td_target - current_q
         self.q_table[(state, action)] = current_q + self.learning_rate * td_error
 
-    def step(self, state: Tuple, env_step_func) -> Tuple[int, int, Tuple]:
-        # Standard Q-learning update using real experience
-        action = self._select_action(state)
-        reward, next_state, terminated, truncated = env_step_func(action)
-
+    def _update(self, state: Tuple, action: int, reward: float, next_state: Tuple, terminated: bool = False, truncated: bool = False) -> None:
         # Update model and Q-values from real experience
         self.model[(state, action)] = (reward, next_state)
         self._update_q(state, action, reward, next_state, terminated=terminated, truncated=truncated)
 
+    def _plan(self) -> None:
         # Planning: replay from stored model
         for _ in range(self.planning_steps):
             if not self.model:
@@ -56,4 +46,27 @@ class DynaQAgent(QLearningAgent):
             sim_state, sim_action = sampled_state_action
             self._update_q(sim_state, sim_action, sim_reward, sim_next_state)
 
+    def _step(self, state: Tuple, env_step_func) -> Tuple[int, int, Tuple]:
+        # Standard Q-learning update using real experience, then planning
+        prof = self.profiler
+        if prof is None:
+            action = self._select_action(state)
+            reward, next_state, terminated, truncated = env_step_func(action)
+            self._update(state, action, reward, next_state, terminated, truncated)
+            self._plan()
+            return action, reward, next_state
+
+        # Same step with each part timed
+        t0 = perf_counter()
+        action = self._select_action(state)
+        t1 = perf_counter()
+        reward, next_state, terminated, truncated = env_step_func(action)
+        t2 = perf_counter()
+        self._update(state, action, reward, next_state, terminated, truncated)
+        t3 = perf_counter()
+        self._plan()
+        prof.add("select", t1 - t0)
+        prof.add("env", t2 - t1)
+        prof.add("update", t3 - t2)
+        prof.add("plan", perf_counter() - t3)
         return action, reward, next_state
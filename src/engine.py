@@ -0,0 +1,218 @@
+"""
+Training and evaluation engine.
+The one episode loop every testbed runs: reset, attach the agent to the first worker, step until the episode ends or hits the step cap,
+count reward, length and food delivered, decay epsilon.
+Anything else (logging, checkpoints, early stopping, extra metrics) plugs in as a callback.
+Per-step hooks only cost anything when a callback actually defines one, otherwise the plain loop runs.
+
+"""
+
+# Imports
+import pickle
+from collections import deque
+from event_log import EventLog, DEBUG, INFO
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from hex_grid_world import HexGridWorld
+
+
+# Base callback, override what's needed
+# Episode hooks get the engine, its lists are already updated when onEpisodeEnd runs
+class Callback(object):
+    def onRunStart(self, engine: "Engine"):
+        pass
+
+    def onEpisodeStart(self, engine: "Engine"):
+        pass
+
+    # Only called when overridden
+    def onStep(self, engine: "Engine", reward: int, terminated: bool, truncated: bool):
+        pass
+
+    def onEpisodeEnd(self, engine: "Engine"):
+        pass
+
+    def onRunEnd(self, engine: "Engine"):
+        pass
+
+
+# Episode loop
+class Engine(object):
+    world: "HexGridWorld"
+    agent: object # Attached to worker 1 after every reset
+    maxSteps: int # Step cap per episode
+    decayEpsilon: bool # Decay the agent's epsilon after every episode, off for greedy evaluation
+    callbacks: list
+    episode: int = 0 # Episodes run so far
+    stop: bool = False # Set by a callback to end the run after the current episode
+    rewards: list # Per episode total reward
+    lengths: list # Per episode steps
+    deliveries: list # Per episode food delivered to the queen
+    history: int # Keep only about this many recent episodes in the lists, None keeps all, for long runs streamed to a metrics store
+
+    # Initialize
+    def __init__(self, world: "HexGridWorld", agent: object, maxSteps: int = 1000, callbacks: list = None, decayEpsilon: bool = True, history: int = None):
+        self.world = world
+        self.agent = agent
+        self.maxSteps = maxSteps
+        self.decayEpsilon = decayEpsilon
+        self.history = history
+        self.callbacks = list(callbacks or [])
+        self.rewards = []
+        self.lengths = []
+        self.deliveries = []
+        # Only callbacks that override onStep are called every step
+        self.stepHooks = [cb.onStep for cb in self.callbacks if type(cb).onStep is not Callback.onStep]
+
+    # Run episodes, returns the engine so its lists can be read off the call
+    def run(self, episodes: int) -> "Engine":
+        self.stop = False
+        for cb in self.callbacks:
+            cb.onRunStart(self)
+        for _ in range(episodes):
+            self.runEpisode()
+            if self.stop:
+                break
+        for cb in self.callbacks:
+            cb.onRunEnd(self)
+        return self
+
+    def runEpisode(self):
+        world = self.world
+        world.reset()
+        start_food = getattr(world.colony[0], "food", 0) if len(world.colony) > 0 else 0
+        # Reattach the persistent agent after reset (new worker object each reset)
+        if len(world.colony) > 1:
+            world.colony[1].q_agent = self.agent
+        for cb in self.callbacks:
+            cb.onEpisodeStart(self)
+
+        total_reward = 0
+        steps = 0
+        terminated = False
+        truncated = False
+        maxSteps = self.maxSteps
+        step = world.step
+        if not self.stepHooks:
+            while not (terminated or truncated) and steps < maxSteps:
+                _, reward, terminated, truncated, _ = step(None)
+                if reward is not None:
+                    total_reward += reward
+                steps += 1
+        else:
+            hooks = self.stepHooks
+            while not (terminated or truncated) and steps < maxSteps:
+                _, reward, terminated, truncated, _ = step(None)
+                if reward is not None:
+                    total_reward += reward
+                steps += 1
+                for hook in hooks:
+                    hook(self, reward, terminated, truncated)
+
+        end_food = getattr(world.colony[0], "food", 0) if len(world.colony) > 0 else 0
+        self.rewards.append(total_reward)
+        self.lengths.append(steps)
+        self.deliveries.append(max(0, end_food - start_food))
+        # Decay epsilon each episode for agents that support it
+        if self.decayEpsilon and hasattr(self.agent, "decay_epsilon"):
+            self.agent.decay_epsilon()
+        for cb in self.callbacks:
+            cb.onEpisodeEnd(self)
+        self.episode += 1
+        # Trim in batches so dropping old episodes stays cheap per episode
+        if self.history is not None and len(self.rewards) >= 2 * self.history:
+            del self.rewards[:-self.history]
+            del self.lengths[:-self.history]
+            del self.deliveries[:-self.history]
+
+
+# Logs every episode at DEBUG and the last 100 episodes' averages every 100 episodes at INFO
+# Keeps its own window of recent episodes, so it stays right when the engine trims its lists to a shorter history
+class ProgressLog(Callback):
+    # Initialize
+    def __init__(self, log: EventLog, every: int = 100, epsilon: float = None, epsilonFormat: str = "ε = {:.3f}"):
+        self.log = log
+        self.every = every
+        self.epsilon = epsilon # Shown when the agent has none
+        self.epsilonFormat = epsilonFormat
+        self.recentRewards = deque(maxlen=every)
+        self.recentLengths = deque(maxlen=every)
+
+    def onEpisodeEnd(self, engine: Engine):
+        episode = engine.episode
+        self.log.emit(DEBUG, "episode", episode=episode, reward=engine.rewards[-1], steps=engine.lengths[-1], deliveries=engine.deliveries[-1])
+        self.recentRewards.append(engine.rewards[-1])
+        self.recentLengths.append(engine.lengths[-1])
+        if episode % self.every == 0:
+            avg_reward = sum(self.recentRewards) / len(self.recentRewards)
+            avg_length = sum(self.recentLengths) / len(self.recentLengths)
+            current_eps = getattr(engine.agent, "epsilon", self.epsilon)
+            self.log.emit(
+                INFO,
+                "progress",
+                msg=f"Episode {episode}: Avg Reward = {avg_reward:.2f}, Avg Length = {avg_length:.2f}, " + self.epsilonFormat.format(current_eps),
+                episode=episode,
+                avg_reward=avg_reward,
+                avg_length=avg_length,
+                epsilon=current_eps,
+            )
+
+
+# Saves the agent's Q-table every so many episodes, and at the end of the run
+class Checkpoint(Callback):
+    # Initialize
+    def __init__(self, path: str, every: int = 100):
+        self.path = path
+        self.every = every
+
+    # Keyed by states, so the file can be loaded without the agent's interner
+    def save(self, engine: Engine):
+        table = engine.agent.q_table
+        interner = getattr(engine.agent, "interner", None)
+        if interner is not None:
+            table = interner.expand(table)
+        with open(self.path, "wb") as f:
+            pickle.dump(table, f)
+
+    def onEpisodeEnd(self, engine: Engine):
+        if (engine.episode + 1) % self.every == 0:
+            self.save(engine)
+
+    def onRunEnd(self, engine: Engine):
+        self.save(engine)
+
+
+# Stops the run once the rolling mean of a metric hasn't improved for `patience` episodes, or has reached `target`
+class EarlyStopping(Callback):
+    best: float = None
+    sinceBest: int = 0
+
+    # Initialize
+    # Metric is "rewards", "lengths" or "deliveries", lengths count as better when lower
+    def __init__(self, metric: str = "rewards", window: int = 50, patience: int = 100, target: float = None, minDelta: float = 0.0):
+        self.metric = metric
+        self.window = window
+        self.patience = patience
+        self.target = target
+        self.minDelta = minDelta
+
+    def onRunStart(self, engine: Engine):
+        self.best = None
+        self.sinceBest = 0
+
+    def onEpisodeEnd(self, engine: Engine):
+        values = getattr(engine, self.metric)
+        if len(values) < self.window:
+            return
+        score = sum(values[-self.window:]) / self.window
+        if self.metric == "lengths":
+            score = -score
+        if self.best is None or score > self.best + self.minDelta:
+            self.best = score
+            self.sinceBest = 0
+        else:
+            self.sinceBest += 1
+        target = self.target if self.target is None or self.metric != "lengths" else -self.target
+        if self.sinceBest >= self.patience or (target is not None and score >= target):
+            engine.stop = True
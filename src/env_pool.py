@@ -0,0 +1,177 @@
+"""
+Subprocess environment pool.
+Runs many HexGridWorld instances spread over worker processes.
+Actions, rewards, observations and done flags are exchanged through shared memory arrays,
+the pipes to the workers only carry a one word command per call.
+Has the same reset/step shape as a single world, just with one entry per environment.
+Finished worlds reset straight away like Gymnasium's autoreset, the last observation of their episode is in that slot's
+info as "final_observation", and in the finalObs array.
+
+Given a list of map seeds, random worlds (worldType=0) draw one of them before every episode instead of keeping one map each,
+so a handful of worlds covers as many maps as there are seeds. Pass a world cache to make each map only once across workers and runs.
+
+"""
+
+# Imports
+import multiprocessing as mp
+import random
+import numpy as np
+
+
+# Worker process loop
+# Owns the worlds for slots [start, end) and writes straight into the shared arrays
+def poolWorker(conn, start: int, end: int, shared: tuple, worldArgs: dict, maxSteps: int | None, seed: int | None, maps: list | None = None):
+    from hex_grid_world import HexGridWorld # Imported here so the parent doesn't need the world loaded
+
+    actions = np.frombuffer(shared[0], dtype=np.int32)
+    obs = np.frombuffer(shared[1], dtype=np.int32)
+    rewards = np.frombuffer(shared[2], dtype=np.float64)
+    terminated = np.frombuffer(shared[3], dtype=np.bool_)
+    truncated = np.frombuffer(shared[4], dtype=np.bool_)
+    finalObs = np.frombuffer(shared[5], dtype=np.int32)
+
+    # Each world gets its own seed off the pool's, so runs repeat no matter how slots are split
+    # With maps, the slot's seed picks which map each episode is played on instead
+    if maps is None:
+        worlds = [HexGridWorld(**worldArgs, seed = None if seed is None else seed + slot) for slot in range(start, end)]
+    else:
+        pickers = [random.Random(None if seed is None else seed + slot) for slot in range(start, end)]
+        worlds = [HexGridWorld(**worldArgs, seed = picker.choice(maps)) for picker in pickers]
+    steps = [0] * (end - start)
+    started = [False] * (end - start) # The first episode is played on the map the world was made with
+
+    # Draw the map of a world's next episode
+    def nextMap(i: int):
+        if maps is None:
+            return
+        if started[i]:
+            worlds[i].useMap(pickers[i].choice(maps))
+        started[i] = True
+    try:
+        while True:
+            cmd = conn.recv()
+            if cmd == "step":
+                for i, world in enumerate(worlds):
+                    slot = start + i
+                    o, r, term, trunc, _ = world.step(int(actions[slot]))
+                    steps[i] += 1
+                    if maxSteps is not None and steps[i] >= maxSteps:
+                        trunc = True
+                    rewards[slot] = r
+                    terminated[slot] = term
+                    truncated[slot] = trunc and not term
+                    finalObs[slot] = o
+                    if term or trunc: # Reset in place so the next step starts a fresh episode
+                        nextMap(i)
+                        o, _ = world.reset()
+                        steps[i] = 0
+                    obs[slot] = o
+            elif cmd == "reset":
+                for i, world in enumerate(worlds):
+                    nextMap(i)
+                    obs[start + i], _ = world.reset()
+                    finalObs[start + i] = obs[start + i]
+                    steps[i] = 0
+            elif cmd == "close":
+                break
+            conn.send(True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for world in worlds:
+            world.close()
+        conn.close()
+
+
+# Pool of worlds across processes
+class EnvPool(object):
+    numEnvs: int # Total worlds in the pool
+    numWorkers: int # Processes they're spread over
+    actions: np.ndarray # Shared, written by the caller before each step
+    obs: np.ndarray # Shared, integer observations written by the workers
+    rewards: np.ndarray # Shared, rewards from the last step
+    terminated: np.ndarray # Shared, done flags from the last step
+    truncated: np.ndarray
+    finalObs: np.ndarray # Shared, observation each world ended the last step on, before any reset
+    closed: bool = False
+
+    # Initialize
+    # Extra keyword arguments are passed to every HexGridWorld
+    # Maps is a list of map seeds for random worlds to draw from every episode, None keeps one map per world
+    def __init__(self, numEnvs: int, numWorkers: int = None, worldType: int = 1, train: bool = True, maxSteps: int = None, seed: int = None, maps: list = None, **worldKwargs):
+        self.numEnvs = numEnvs
+        self.numWorkers = min(numWorkers or mp.cpu_count(), numEnvs)
+        ctx = mp.get_context()
+
+        # Shared memory, lock-free since every slot only has one writer at a time
+        shared = (
+            ctx.RawArray("i", numEnvs),
+            ctx.RawArray("i", numEnvs),
+            ctx.RawArray("d", numEnvs),
+            ctx.RawArray("b", numEnvs),
+            ctx.RawArray("b", numEnvs),
+            ctx.RawArray("i", numEnvs),
+        )
+        self.actions = np.frombuffer(shared[0], dtype=np.int32)
+        self.obs = np.frombuffer(shared[1], dtype=np.int32)
+        self.rewards = np.frombuffer(shared[2], dtype=np.float64)
+        self.terminated = np.frombuffer(shared[3], dtype=np.bool_)
+        self.truncated = np.frombuffer(shared[4], dtype=np.bool_)
+        self.finalObs = np.frombuffer(shared[5], dtype=np.int32)
+
+        # Split the slots as evenly as possible
+        worldArgs = dict(train = train, worldType = worldType, animate = False, gymApi = True, **worldKwargs)
+        bounds = np.linspace(0, numEnvs, self.numWorkers + 1).astype(int)
+        self.conns = []
+        self.procs = []
+        for w in range(self.numWorkers):
+            parentConn, childConn = ctx.Pipe()
+            proc = ctx.Process(target = poolWorker, args = (childConn, bounds[w], bounds[w + 1], shared, worldArgs, maxSteps, seed, maps), daemon = True)
+            proc.start()
+            childConn.close()
+            self.conns.append(parentConn)
+            self.procs.append(proc)
+
+    # Send a command to every worker and wait for them all
+    def broadcast(self, cmd: str):
+        for conn in self.conns:
+            conn.send(cmd)
+        for conn in self.conns:
+            conn.recv()
+
+    # Reset every world, returns the starting observations
+    def reset(self) -> np.ndarray:
+        self.broadcast("reset")
+        return self.obs.copy()
+
+    # Step every world with one action each
+    # Finished worlds are reset straight away, the returned observation is then from the new episode
+    # and their info holds the one the episode ended on as "final_observation"
+    def step(self, actions) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, list]:
+        self.actions[:] = actions
+        self.broadcast("step")
+        terminated = self.terminated.copy()
+        truncated = self.truncated.copy()
+        finalObs = self.finalObs.tolist()
+        infos = [{"final_observation": finalObs[i]} if terminated[i] or truncated[i] else {} for i in range(self.numEnvs)]
+        return self.obs.copy(), self.rewards.copy(), terminated, truncated, infos
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        for conn in self.conns:
+            try:
+                conn.send("close")
+            except (BrokenPipeError, OSError):
+                pass
+        for proc in self.procs:
+            proc.join(timeout = 5)
+            if proc.is_alive():
+                proc.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
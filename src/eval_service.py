@@ -0,0 +1,167 @@
+"""
+Greedy policy evaluation service.
+A trained Q-table is compiled into a frozen greedy policy: the best actions for each of the ants.obsCount observations.
+Its fingerprint is a hash of that policy, so Q-tables that only differ in values that don't change any choice share results.
+
+On a deterministic world (presetWorld1: one worker, one food, the queen never spawns before the episode ends)
+a frozen policy that never has to break a tie plays the same episode every time, so one episode is run, cached under
+the fingerprint and repeated for as many as were asked for.
+Everything else is split into fixed size jobs with their own seeds and spread over worker processes,
+so seeded results come out the same whatever the worker count.
+
+Unlike evaluating a copy of the learning agent, the frozen policy doesn't keep learning during evaluation.
+
+"""
+
+# Imports
+import hashlib
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from ants import obsCount, encodeState
+from engine import Engine
+from hex_grid_world import HexGridWorld
+from result_store import ResultStore
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from state_interner import StateInterner
+
+
+# Best actions per observation, every action for states the table has never seen
+# Tables of an agent with a StateInterner key states by id, pass the interner to look them up
+def compilePolicy(qTable: dict, nActions: int = 5, interner: "StateInterner" = None) -> tuple[tuple[int, ...], ...]:
+    values = [[0.0] * nActions for _ in range(obsCount)]
+    for (state, action), q in qTable.items():
+        if interner is not None:
+            state = interner.states[state]
+        values[encodeState(state)][action] = q
+    policy = []
+    for row in values:
+        best = max(row)
+        policy.append(tuple(a for a, q in enumerate(row) if q == best))
+    return tuple(policy)
+
+
+def policyFingerprint(policy: tuple[tuple[int, ...], ...]) -> str:
+    return hashlib.sha1(repr(policy).encode()).hexdigest()
+
+
+# Agent playing a frozen policy, ties are broken with its own random source and counted
+class GreedyPolicyAgent(object):
+    policy: tuple
+    rng: random.Random
+    ties: int = 0 # Tie breaks so far, none means the choices didn't depend on chance
+
+    # Initialize
+    def __init__(self, policy: tuple, seed: int = None):
+        self.policy = policy
+        self.rng = random.Random(seed)
+        self.ties = 0
+
+    def step(self, state: tuple, env_step_func) -> tuple[int, int, tuple]:
+        best = self.policy[encodeState(state)]
+        if len(best) == 1:
+            action = best[0]
+        else:
+            self.ties += 1
+            action = self.rng.choice(best)
+        reward, next_state, _, _ = env_step_func(action)
+        return action, reward, next_state
+
+
+# Play episodes of a policy in a full world (train=False)
+# Top level so the process pool can run it
+# Returns per-episode rewards, lengths and deliveries, and the number of tie breaks
+def playEpisodes(policy: tuple, worldType: int, maxSteps: int, episodes: int, seed: int = None) -> tuple[list, list, list, int]:
+    world = HexGridWorld(train=False, worldType=worldType, seed=seed)
+    agent = GreedyPolicyAgent(policy, seed)
+    engine = Engine(world, agent, maxSteps=maxSteps, decayEpsilon=False).run(episodes)
+    return engine.rewards, engine.lengths, engine.deliveries, agent.ties
+
+
+# Evaluates policies, caching deterministic results and spreading the rest over processes
+class EvalService(object):
+    workers: int # Worker processes for stochastic evaluations, 1 runs them inline
+    jobSize: int # Episodes per job
+    store: ResultStore # On-disk cache of deterministic results, shared between runs, None keeps them in memory only
+    cache: dict # (fingerprint, world type, step cap) -> (reward, length, deliveries) of the one deterministic episode
+    hits: int = 0
+    misses: int = 0
+
+    # Initialize
+    def __init__(self, workers: int = None, jobSize: int = 10, store: ResultStore = None):
+        self.workers = workers if workers is not None else (os.cpu_count() or 1)
+        self.jobSize = jobSize
+        self.store = store
+        self.cache = {}
+        self.pool = None
+
+    # Everything that decides a deterministic episode
+    def config(self, fingerprint: str, worldType: int, maxSteps: int) -> dict:
+        return {"run": "greedy_eval", "policy": fingerprint, "worldType": worldType, "maxSteps": maxSteps}
+
+    def lookup(self, config: dict) -> tuple:
+        key = (config["policy"], config["worldType"], config["maxSteps"])
+        if key in self.cache:
+            return self.cache[key]
+        if self.store is not None:
+            entry = self.store.get(config)
+            if entry is not None:
+                self.cache[key] = tuple(entry["summary"][f] for f in ("reward", "length", "deliveries"))
+                return self.cache[key]
+        return None
+
+    def remember(self, config: dict, episode: tuple):
+        self.cache[(config["policy"], config["worldType"], config["maxSteps"])] = episode
+        if self.store is not None:
+            self.store.put(config, dict(zip(("reward", "length", "deliveries"), episode)), {})
+
+    # Per-episode rewards, lengths and deliveries of the greedy policy of a Q-table
+    # Deterministic defaults to presetWorld1, random worlds need a seed to be the same map in every process
+    def evaluate(self, qTable: dict, worldType: int = 1, maxSteps: int = 1000, episodes: int = 50, seed: int = None, deterministic: bool = None, nActions: int = 5, interner: "StateInterner" = None) -> tuple[list, list, list]:
+        policy = compilePolicy(qTable, nActions, interner)
+        if deterministic is None:
+            deterministic = worldType == 1
+        if deterministic:
+            config = self.config(policyFingerprint(policy), worldType, maxSteps)
+            episode = self.lookup(config)
+            if episode is not None:
+                self.hits += 1
+                return [episode[0]] * episodes, [episode[1]] * episodes, [episode[2]] * episodes
+            self.misses += 1
+            rewards, lengths, deliveries, ties = playEpisodes(policy, worldType, maxSteps, 1, seed)
+            if ties == 0:
+                self.remember(config, (rewards[0], lengths[0], deliveries[0]))
+                return rewards * episodes, lengths * episodes, deliveries * episodes
+        return self.spread(policy, worldType, maxSteps, episodes, seed)
+
+    # Fixed size jobs, each with its own seed off the evaluation's
+    def spread(self, policy: tuple, worldType: int, maxSteps: int, episodes: int, seed: int = None) -> tuple[list, list, list]:
+        jobs = []
+        for i, start in enumerate(range(0, episodes, self.jobSize)):
+            jobSeed = None if seed is None else seed + i
+            jobs.append((policy, worldType, maxSteps, min(self.jobSize, episodes - start), jobSeed))
+        if self.workers <= 1 or len(jobs) == 1:
+            results = [playEpisodes(*job) for job in jobs]
+        else:
+            if self.pool is None:
+                self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            results = list(self.pool.map(playEpisodes, *zip(*jobs)))
+        rewards, lengths, deliveries = [], [], []
+        for r, l, d, _ in results:
+            rewards += r
+            lengths += l
+            deliveries += d
+        return rewards, lengths, deliveries
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown()
+            self.pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,78 @@
+"""
+Structured event logging.
+Replaces bare prints in the simulation and training loops.
+Records are small dicts with a level and an event name, buffered and written out in batches as JSONL.
+Off by default, so the hot path only pays for one level comparison.
+
+"""
+
+# Imports
+import atexit
+import json
+import sys
+import time
+
+# Levels
+DEBUG = 10 # Per episode chatter, e.g. world resets
+INFO = 20 # Progress summaries
+WARNING = 30
+OFF = 100 # Nothing gets through
+
+
+# Event sink
+class EventLog(object):
+    level: int # Records below this are dropped on the spot
+    path: str = None # JSONL file to append to, None to keep nothing on disk
+    echo: bool # Print records with a message to stdout as they come in
+    bufferSize: int # Records held before a write
+    buffer: list
+
+    # Initialize
+    def __init__(self, level: int = OFF, path: str = None, echo: bool = False, bufferSize: int = 256):
+        self.level = level
+        self.path = path
+        self.echo = echo
+        self.bufferSize = bufferSize
+        self.buffer = []
+        if path is not None:
+            atexit.register(self.flush)
+
+    # Checker, for callers that want to skip building expensive fields
+    def enabled(self, level: int) -> bool:
+        return level >= self.level
+
+    # Record an event
+    # msg is the human readable line shown when echoing, everything else is stored as is
+    def emit(self, level: int, event: str, msg: str = None, **fields):
+        if level < self.level:
+            return
+        if self.echo and msg is not None:
+            print(msg)
+        if self.path is None:
+            return
+        record = {"t": round(time.time(), 3), "lvl": level, "ev": event}
+        record.update(fields)
+        self.buffer.append(record)
+        if len(self.buffer) >= self.bufferSize:
+            self.flush()
+
+    # Write out everything buffered
+    def flush(self):
+        if not self.buffer:
+            return
+        lines = [json.dumps(record, separators = (",", ":")) for record in self.buffer]
+        self.buffer = []
+        if self.path == "-":
+            sys.stdout.write("\n".join(lines) + "\n")
+        else:
+            with open(self.path, "a") as f:
+                f.write("\n".join(lines) + "\n")
+
+    def close(self):
+        self.flush()
+        if self.path is not None:
+            atexit.unregister(self.flush)
+
+
+# Shared sink that drops everything, used when nothing is passed in
+nullLog = EventLog()
@@ -16,6 +16,7 @@ class HexGrid(object):
     zR: int # Z range (world dimension, going left and down)
     cells: list # Special hollowed 3D array of chars, storing object tiles
     trails: list # Special hollowed 3D array of ints, storing trail values
+    dirty: set = None # Coords changed since the last draw, None while nobody is watching
 
     # Initialize
     def __init__(self, xR: int, yR: int, zR: int):
@@ -48,6 +49,66 @@ class HexGrid(object):
             self.cells[0][i] = ["E" for ii in range(self.zR)]
             self.trails[0][i] = [0 for ii in range(self.zR)]
 
+    # Number of cells actually stored, all three faces with shared edges counted once
+    def cellCount(self) -> int:
+        return 1 + self.xR * (self.yR - 1) + self.yR * (self.zR - 1) + self.zR * (self.xR - 1)
+
+    # Flat ordering of the stored cells, same order random maps are memorized in
+    # (0,0,0) first, then the XY face, the YZ face and the ZX face, each row by row
+    def flatCoords(self) -> list[tuple[int, int, int]]:
+        coords = [(0,0,0)]
+        coords += [(i,ii,0) for i in range(self.xR) for ii in range(1, self.yR)]
+        coords += [(0,i,ii) for i in range(self.yR) for ii in range(1, self.zR)]
+        coords += [(ii,0,i) for i in range(self.zR) for ii in range(1, self.xR)]
+        return coords
+
+    # Position of a normalized coord in the flat ordering
+    def flatIndex(self, c: tuple[int, int, int]) -> int:
+        if c[2] == 0 and c[1] > 0:
+            return 1 + c[0] * (self.yR - 1) + c[1] - 1
+        if c[0] == 0 and c[2] > 0:
+            return 1 + self.xR * (self.yR - 1) + c[1] * (self.zR - 1) + c[2] - 1
+        if c[1] == 0 and c[0] > 0:
+            return 1 + self.xR * (self.yR - 1) + self.yR * (self.zR - 1) + c[2] * (self.xR - 1) + c[0] - 1
+        return 0
+
+    # All cell values in flat order
+    def flatCells(self) -> list[str]:
+        return self.flatten(self.cells)
+
+    # All trail values in flat order
+    def flatTrails(self) -> list[int]:
+        return self.flatten(self.trails)
+
+    # Read one of the hollowed arrays out in flat order
+    def flatten(self, a: list) -> list:
+        out = [a[0][0][0]]
+        out += [a[i][ii][0] for i in range(self.xR) for ii in range(1, self.yR)]
+        for i in range(self.yR):
+            out += a[0][i][1:]
+        out += [a[ii][0][i] for i in range(self.zR) for ii in range(1, self.xR)]
+        return out
+
+    # Load cell and trail values given in flat order, the reverse of flatCells/flatTrails
+    def loadFlat(self, cells: list, trails: list = None):
+        self.cells = self.unflatten(cells)
+        if trails is not None:
+            self.trails = self.unflatten(trails)
+
+    # Build one of the hollowed arrays from a flat list
+    def unflatten(self, flat: list) -> list:
+        xR, yR, zR = self.xR, self.yR, self.zR
+        startYZ = 1 + xR * (yR - 1)
+        startZX = startYZ + yR * (zR - 1)
+        a = [[[flat[1 + i * (yR - 1) + ii - 1]] for ii in range(yR)] for i in range(xR)]
+        # The three face edges hold the full Z runs
+        a[0][0] = [flat[0]] + list(flat[startYZ:startYZ + zR - 1])
+        for ii in range(1, yR):
+            a[0][ii] = [flat[ii]] + list(flat[startYZ + ii * (zR - 1):startYZ + (ii + 1) * (zR - 1)])
+        for i in range(1, xR):
+            a[i][0] = list(flat[startZX + i - 1:startZX + zR * (xR - 1):xR - 1])
+        return a
+
     # Convert and flatten a coordinate to fit within the grid system
     # Catches coords without at least one 0 and with negative values
     # (1,1,1) == (0,0,0), because they cancel, and (-1,0,0) == (0,1,1) for all axes
@@ -85,19 +146,42 @@ class HexGrid(object):
     # Setter
     def setCell(self, c: tuple[int, int, int], new: str):
         self.cells[c[0]][c[1]][c[2]] = new
+        if self.dirty is not None:
+            self.dirty.add(c)
     
     # Setter
     def setTrail(self, c: tuple[int, int, int], new: str):
         self.trails[c[0]][c[1]][c[2]] = new
+        if self.dirty is not None:
+            self.dirty.add(c)
     
     # Setter with default value for new trails
     def addTrail(self, c: tuple[int, int, int]):
         self.trails[c[0]][c[1]][c[2]] = 250 # This is changeable
+        if self.dirty is not None:
+            self.dirty.add(c)
     
     # Reduce the strength of the trail at a cell by 1
     def fadeTrail(self, c: tuple[int, int, int]):
         if self.trails[c[0]][c[1]][c[2]] > 0:
             self.trails[c[0]][c[1]][c[2]] -= 1
+            if self.dirty is not None:
+                self.dirty.add(c)
+
+    # Start recording changed cells, for the animator's partial redraws
+    def trackChanges(self):
+        self.dirty = set()
+
+    # Flag a cell for redrawing when its look changed without a setter, like an ant picking up food
+    def markDirty(self, c: tuple[int, int, int]):
+        if self.dirty is not None:
+            self.dirty.add(c)
+
+    # Hand over the changed cells and start a fresh set
+    def takeDirty(self) -> set:
+        dirty = self.dirty
+        self.dirty = set()
+        return dirty
     
     # Fade trail over whole grid
     def fadeAllTrails(self):
@@ -0,0 +1,40 @@
+"""
+Gymnasium environment.
+HexGridWorld as a gymnasium.Env, with its spaces and the HexGridWorld-v0 registration.
+Kept apart from the world so only code that uses Gymnasium pays for importing it.
+Registration happens here and only here, gym.make("hex_grid_env:HexGridWorld-v0") imports this module and registers it on demand,
+or import hex_grid_env first and use gym.make("HexGridWorld-v0").
+
+"""
+
+# Imports
+import gymnasium as gym
+from gymnasium import spaces
+import ants
+from hex_grid_world import HexGridWorld
+
+
+# Gymnasium version of the world, Gymnasium mode on by default
+class HexGridEnv(HexGridWorld, gym.Env):
+    # Initialize
+    def __init__(self, train: bool = True, worldType: int = 1, gymApi: bool = True, **kwargs):
+        # Spaces, the worker's move/pick up/give choice and its encoded state
+        self.action_space = spaces.Discrete(5)
+        self.observation_space = spaces.Discrete(ants.obsCount)
+        super().__init__(train, worldType, gymApi = gymApi, **kwargs)
+
+    # Seeds Gymnasium's own random source too
+    def reset(self, seed: int = None, options: dict = None):
+        if seed is not None:
+            gym.Env.reset(self, seed = seed)
+        return super().reset(seed = seed, options = options)
+
+
+# Register for gym.make and the vector env helpers
+if "HexGridWorld-v0" not in gym.registry:
+    gym.register(
+        id = "HexGridWorld-v0",
+        entry_point = "hex_grid_env:HexGridEnv",
+        kwargs = {"train": True, "worldType": 1, "gymApi": True},
+        max_episode_steps = 1000,
+    )
@@ -21,79 +21,161 @@ New files to create:
 """
 
 # Imports
-import gymnasium as gym
+# Pygame and Gymnasium are only loaded when a window or the Gymnasium class is actually used, so headless workers start fast
 from hex_grid import HexGrid
 import ants
-import window_animator
 import worlds
+from rasterizer import Rasterizer
+from render_process import RenderProcess
+from trajectory import TrajectoryRecorder
+from world_cache import WorldCache
+from event_log import EventLog, nullLog, DEBUG, INFO
+import random
+from time import perf_counter
 from random import randint
 from time import sleep # For the animation
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import window_animator
+    import profiling
 
 
 # World manager
-class HexGridWorld(gym.Env):
+# The Gymnasium registered version with spaces is HexGridEnv in hex_grid_env.py, make it with gym.make("hex_grid_env:HexGridWorld-v0")
+class HexGridWorld(object):
     train: bool # Train AI
-    worldType: int # World style, 0 == random map, >=1 == preset map
+    worldType: int # World style, 0 == random map, 1 == preset map, 2 == huge map generated in chunks
     xR: int # X range (world dimension, going up)
     yR: int # Y range (world dimension, going right and down)
     zR: int # Z range (world dimension, going left and down)
+    dims: tuple # Dimensions asked for, None where the map picks them
     stepCount: int = 0 # Track number of steps taken
     grid: HexGrid # The world
     gridMemory: list = None # Store random map for resets
+    mapSeed: int = None # Seed of a chunked map, kept for resets
     colony: list[ants.Ant] = [] # The ants
     animate: bool = False # Toggle Pygame rendering (unnecessary while training)
-    animator: window_animator.Animator = None # The Pygame display handler
+    animator: "window_animator.Animator" = None # The Pygame display handler
+    rasterizer: Rasterizer = None # The headless frame maker for rgb_array
+    renderer: RenderProcess = None # The Pygame display in its own process, when rendering in the background
+    log: EventLog = nullLog # Where status events go, silent unless one is passed in
+    gymApi: bool = False # Follow the Gymnasium spec: int observations, (obs, info) from reset, outside actions
+    rng = random # Random source for the world and its ants, the global one unless seeded
+    worldSeed: int = None # Seed the world was made with, if any
+    generator: str = "python" # Random map maker, "python" for the original, "numpy" for the bulk one, both make the same map
+    recorder: TrajectoryRecorder = None # Logs every worker action when attached
+    worldCache: WorldCache = None # On-disk store of seeded random maps
+    cacheKey: str = None # This world's entry in the cache, while its map is being made
+    render_mode: str = None # "human" for a window, "rgb_array" for headless frames
+    profiler: "profiling.Profiler" = None # Times each phase of a step when attached
+    metadata = {"render_modes": ["human", "rgb_array"], "render_fps": 30}
     
     # Initialize
-    def __init__(self, train: bool, worldType: int, x: int = None, y: int = None, z:int = None, animate: int = False, windowSize: tuple[int, int] = (1250, 750)):
+    def __init__(self, train: bool, worldType: int, x: int = None, y: int = None, z:int = None, animate: int = False, windowSize: tuple[int, int] = (1250, 750), log: EventLog = None, gymApi: bool = False, seed: int = None, render_mode: str = None, asyncRender: bool = False, recorder: TrajectoryRecorder = None, generator: str = "python", worldCache: WorldCache = None):
         # Setup
         self.train = train
+        if log is not None:
+            self.log = log
+        self.gymApi = gymApi
+        self.generator = generator
+        self.worldCache = worldCache
+        if seed is not None:
+            self.worldSeed = seed
+            self.rng = random.Random(seed)
         self.worldType = worldType
         # Preset will override these, random will fill in the gaps
         self.xR = x
         self.yR = y
         self.zR = z
+        self.dims = (x, y, z)
         # Generate world
+        self.colony = []
         self.buildWorld()
         # Set up animation
-        if animate:
+        # Headless frames are only made when render() is called
+        if render_mode == "rgb_array":
+            self.render_mode = render_mode
+            self.rasterizer = Rasterizer(self.xR, self.yR, self.zR, windowSize)
+        elif animate or render_mode == "human":
+            self.render_mode = "human"
             self.animate = True
-            self.animator = window_animator.Animator(self.xR, self.yR, self.zR, windowSize)
-            self.render()
-            sleep(1)
+            if asyncRender: # Window runs on its own, frames are dropped rather than waited on
+                self.renderer = RenderProcess(self.xR, self.yR, self.zR, windowSize, fps = self.metadata["render_fps"])
+                self.renderer.submit(self.grid, self.colony, force = True)
+            else:
+                import window_animator
+                self.animator = window_animator.Animator(self.xR, self.yR, self.zR, windowSize)
+                self.render()
+                sleep(1)
+        # Recording starts with the next reset, once the map is known
+        if recorder is not None:
+            self.recorder = recorder
+            recorder.begin(self)
         # Go!
-        print(self.xR, " ", self.yR, " ", self.zR)
-        print("Started")
+        self.log.emit(INFO, "started", msg = f"Started {self.xR} {self.yR} {self.zR}", x = self.xR, y = self.yR, z = self.zR, worldType = self.worldType)
 
     # Reset
-    def reset(self):
+    # Seeding swaps in a fresh random source, random maps already made are kept
+    # While recording, every episode gets its own seed so it can be replayed on its own
+    def reset(self, seed: int = None, options: dict = None):
+        if seed is None and self.recorder is not None:
+            seed = self.rng.getrandbits(63)
+        if seed is not None:
+            self.rng = random.Random(seed)
+        if self.recorder is not None:
+            self.recorder.beginEpisode(seed)
         # Wipe and regenerate world
         self.grid = None
         self.colony = []
         self.buildWorld()
         # Keep going!
-        print("Reset")
+        self.log.emit(DEBUG, "reset", step = self.stepCount)
         # Pass in animation window
-        if self.animate:
+        if self.renderer is not None:
+            self.renderer.submit(self.grid, self.colony, force = True)
+        elif self.animate:
             self.render()
             sleep(1)
+        if self.gymApi:
+            return self.observe(), {}
     
+    # Switch a random world to another seed's map from the next reset on, the same map and random source a new world with that seed would have
+    # Used by pools that sample a map per episode, with a world cache switching back to a map only loads it
+    def useMap(self, seed: int):
+        if seed == self.worldSeed and self.gridMemory is not None:
+            return
+        self.worldSeed = seed
+        self.rng = random.Random(seed)
+        self.gridMemory = None
+        self.xR, self.yR, self.zR = self.dims
+
     # Run simulation step
+    # In Gymnasium mode the action drives the first worker and the observation is an int
+    # With a profiler attached every phase is timed, otherwise that's just a None check per phase
     def step(self, action: int | None) -> tuple[tuple[bool, str, str, str] | None, int | None, bool, bool, str | None]:
+        prof = self.profiler
+        if prof is not None:
+            tStep = perf_counter()
         s = None
         a = None
         r = None
         s_ = None
         info = None
         if self.train:
-            if len(self.colony) > 1 and self.colony[1].q_agent is None:
+            if len(self.colony) > 1 and self.colony[1].q_agent is None and not self.gymApi:
                 from q_learning import QLearningAgent
                 self.colony[1].q_agent = QLearningAgent()
 
             if len(self.colony) > 1:
                 s, a, r, s_ = self.colony[1].act(action = action)
+                if self.recorder is not None:
+                    worker = self.colony[1]
+                    self.recorder.record(1, a, r, worker.x, worker.y, worker.z)
             else:
                 s, a, r, s_ = None, None, 0, None
+            if prof is not None:
+                prof.add("ants", perf_counter() - tStep)
         else:
             r = 0  # Initialize reward for evaluation mode
             actCycle = 0
@@ -102,25 +184,49 @@ class HexGridWorld(gym.Env):
                 # Queen (index 0) doesn't need Q-agent, Worker (index 1+) does
                 if actCycle == 0: # The queen doesn't need a Q-agent, it just acts normally
                     self.colony[actCycle].act()
+                elif actCycle == 1 and self.gymApi: # Outside action for the first worker
+                    s, a, r_worker, s_ = self.colony[actCycle].act(action = action)
+                    r += r_worker
+                    if self.recorder is not None:
+                        worker = self.colony[actCycle]
+                        self.recorder.record(actCycle, a, r_worker, worker.x, worker.y, worker.z)
                 elif actCycle > 0 and self.colony[actCycle].q_agent is not None: # The worker needs a Q-agent to act
                     # Capture reward from worker's act() call for evaluation
                     s, a, r_worker, s_ = self.colony[actCycle].act()
                     # Accumulate reward from worker
                     if r_worker is not None:
                         r += r_worker
+                    if self.recorder is not None:
+                        worker = self.colony[actCycle]
+                        self.recorder.record(actCycle, a, r_worker, worker.x, worker.y, worker.z)
                 actCycle += 1
+            if prof is not None:
+                t = perf_counter()
+                prof.add("ants", t - tStep)
             self.grid.fadeAllTrails()
+            if prof is not None:
+                prof.add("fade", perf_counter() - t)
 
+        if prof is not None:
+            t = perf_counter()
         for ant in self.colony:
             if ant.age >= 5000:
                 ant.die()
                 self.colony.remove(ant)
                 del ant
+        if prof is not None:
+            prof.add("deaths", perf_counter() - t)
 
         self.stepCount += 1
+        if self.recorder is not None:
+            self.recorder.endStep()
 
         if self.animate:
+            if prof is not None:
+                t = perf_counter()
             self.render()
+            if prof is not None:
+                prof.add("render", perf_counter() - t)
 
         terminated = False
         truncated = False
@@ -128,30 +234,65 @@ class HexGridWorld(gym.Env):
         if len(self.colony) > 0 and self.colony[0].food > 0: #changed from self.train to self.colony because self.train = False during evaluation mode and then the episode would never terminate
             terminated = True
             if self.train:
-                print("Terminated")
+                self.log.emit(DEBUG, "terminated", step = self.stepCount)
         elif len(self.colony) == 1:
             truncated = True
             if self.train:
-                print("Truncated")
+                self.log.emit(DEBUG, "truncated", step = self.stepCount)
+        if prof is not None:
+            prof.add("step", perf_counter() - tStep)
+        if self.gymApi:
+            return self.observe(), r, terminated, truncated, {}
         return s_, r, terminated, truncated, info
+
+    # Encoded state of the first worker, 0 if there isn't one
+    def observe(self) -> int:
+        if len(self.colony) < 2:
+            return 0
+        worker = self.colony[1]
+        vision, _ = worker.observe()
+        return ants.encodeState((worker.hasFood, vision[0], vision[1], vision[2]))
     
     def render(self):
-        self.animator.drawFullGrid(self.grid)
-        for ant in self.colony:
-            if ant == self.colony[0]:
-                self.animator.drawCell(self.grid, (ant.x,ant.y,ant.z), antDir = ant.dir)
-            else:
-                self.animator.drawCell(self.grid, (ant.x,ant.y,ant.z), antDir = ant.dir, antHasFood = ant.hasFood)
+        if self.rasterizer is not None:
+            return self.rasterizer.frame(self.grid, self.colony)
+        if self.renderer is not None:
+            self.renderer.submit(self.grid, self.colony)
+            return
+        carriers = {(ant.x,ant.y,ant.z) for ant in self.colony[1:] if ant.hasFood}
+        if self.grid.dirty is None: # Fresh grid, draw it all and watch it from here on
+            self.grid.trackChanges()
+            self.animator.drawFullGrid(self.grid, carriers)
+        else: # Only what changed since the last frame
+            self.animator.drawCells(self.grid, self.grid.takeDirty(), carriers)
         self.animator.updateWindow()
 
+    # Also closes an attached recorder, so its buffered steps make it to the log
     def close(self):
-        return
+        if self.renderer is not None:
+            self.renderer.close()
+            self.renderer = None
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
 
+    # Seeded random maps are looked up in the world cache first, and stored there once made
     def buildWorld(self):
         if self.worldType == 1:
             worlds.presetWorld1(self)
+            return
+        if self.worldType == 2:
+            worlds.chunkedWorld(self)
+            return
+        if self.gridMemory is None and self.worldCache is not None and self.worldSeed is not None:
+            self.cacheKey = self.worldCache.key(self.worldSeed, (self.xR,self.yR,self.zR))
+            if self.worldCache.load(self.cacheKey, self):
+                self.cacheKey = None
+        if self.generator == "numpy":
+            worlds.randomWorldFast(self)
         else:
             worlds.randomWorld(self)
+        self.cacheKey = None
         
 
 if __name__ == "__main__":
@@ -0,0 +1,184 @@
+"""
+Columnar metrics store.
+Per-episode metrics go to disk as they are produced, one raw float64 file per run and column, appended a chunk at a time,
+with a small JSON index holding every run's metadata.
+Columns are read back as memory maps, so runs can be filtered, summarized and downsampled for plots without loading them whole.
+
+Layout:
+root/index.json              run name -> metadata
+root/<run name>/<column>.f8  little endian float64 values, one per episode
+
+"""
+
+# Imports
+import json
+import os
+import tempfile
+import numpy as np
+from engine import Callback, Engine
+
+suffix = ".f8"
+dtype = np.dtype("<f8")
+
+
+# Appends columns of one run in chunks
+class ColumnWriter(object):
+    directory: str
+    chunk: int # Values buffered per column before they're written
+    buffers: dict # Column -> (buffer array, values in it)
+
+    # Initialize, replacing any earlier data of the run
+    def __init__(self, directory: str, chunk: int = 4096):
+        self.directory = directory
+        self.chunk = chunk
+        self.buffers = {}
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(suffix):
+                os.remove(os.path.join(directory, name))
+
+    # One value per column, usually one episode
+    def append(self, **values):
+        for column, value in values.items():
+            buffer = self.buffers.get(column)
+            if buffer is None:
+                buffer = [np.empty(self.chunk, dtype=dtype), 0]
+                self.buffers[column] = buffer
+            buffer[0][buffer[1]] = value
+            buffer[1] += 1
+            if buffer[1] == self.chunk:
+                self.flushColumn(column)
+
+    # Many values of one column at once
+    def extend(self, column: str, values):
+        self.flushColumn(column)
+        with open(os.path.join(self.directory, column + suffix), "ab") as f:
+            f.write(np.asarray(values, dtype=dtype).tobytes())
+
+    def flushColumn(self, column: str):
+        buffer = self.buffers.get(column)
+        if buffer is None or buffer[1] == 0:
+            return
+        with open(os.path.join(self.directory, column + suffix), "ab") as f:
+            f.write(buffer[0][:buffer[1]].tobytes())
+        buffer[1] = 0
+
+    def flush(self):
+        for column in self.buffers:
+            self.flushColumn(column)
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Engine callback streaming every episode's reward, length and deliveries to a writer
+# Pair with Engine(history=...) so the engine's own lists stay short too
+class MetricsRecorder(Callback):
+    # Initialize
+    def __init__(self, writer: ColumnWriter, prefix: str = "episode_"):
+        self.writer = writer
+        self.prefix = prefix
+
+    def onEpisodeEnd(self, engine: Engine):
+        self.writer.append(**{
+            self.prefix + "rewards": engine.rewards[-1],
+            self.prefix + "lengths": engine.lengths[-1],
+            self.prefix + "deliveries": engine.deliveries[-1],
+        })
+
+    def onRunEnd(self, engine: Engine):
+        self.writer.flush()
+
+
+# Directory of runs
+class MetricsStore(object):
+    root: str
+
+    # Initialize
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def indexPath(self) -> str:
+        return os.path.join(self.root, "index.json")
+
+    def runDir(self, name: str) -> str:
+        return os.path.join(self.root, name)
+
+    # Writer for a run's columns, the run shows up in queries once it's registered
+    def writer(self, name: str, chunk: int = 4096) -> ColumnWriter:
+        return ColumnWriter(self.runDir(name), chunk)
+
+    # Every run's metadata
+    def index(self) -> dict:
+        try:
+            with open(self.indexPath()) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    # Add or replace a run's metadata, rewriting the index atomically
+    def register(self, name: str, meta: dict = None):
+        index = self.index()
+        index[name] = meta or {}
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(index, f, default=str)
+        os.replace(tmp, self.indexPath())
+
+    # Write whole columns of a finished run and register it
+    def write(self, name: str, columns: dict, meta: dict = None):
+        with self.writer(name) as writer:
+            for column, values in columns.items():
+                writer.extend(column, values)
+        self.register(name, meta)
+
+    def has(self, name: str) -> bool:
+        return name in self.index()
+
+    # Names of runs whose metadata has all the given values
+    def runs(self, **meta) -> list[str]:
+        return [name for name, runMeta in self.index().items() if all(runMeta.get(k) == v for k, v in meta.items())]
+
+    def columns(self, name: str) -> list[str]:
+        return sorted(f[:-len(suffix)] for f in os.listdir(self.runDir(name)) if f.endswith(suffix))
+
+    # Read-only memory map of one column
+    def column(self, name: str, column: str) -> np.ndarray:
+        path = os.path.join(self.runDir(name), column + suffix)
+        if os.path.getsize(path) == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r")
+
+    # Mean of a column, optionally over its last values only
+    def mean(self, name: str, column: str, last: int = None) -> float:
+        values = self.column(name, column)
+        if last is not None:
+            values = values[-last:]
+        return float(values.mean()) if len(values) > 0 else float("nan")
+
+    # At most `points` block means of a column, and the episode each block starts at, for plotting long runs
+    def downsample(self, name: str, column: str, points: int = 1000) -> tuple[np.ndarray, np.ndarray]:
+        values = self.column(name, column)
+        block = max(1, -(-len(values) // points))
+        if block == 1:
+            return np.arange(len(values)), np.array(values)
+        full = len(values) // block * block
+        # A few blocks at a time, so only that much of the column is ever read in at once
+        step = block * 64
+        means = [values[i:min(i + step, full)].reshape(-1, block).mean(axis=1) for i in range(0, full, step)]
+        if full < len(values):
+            means.append(np.array([values[full:].mean()]))
+        return np.arange(0, len(values), block), np.concatenate(means)
+
+    # A column of several runs as one (runs, episodes) array, cut to the shortest run
+    def stack(self, names: list[str], column: str) -> np.ndarray:
+        columns = [self.column(name, column) for name in names]
+        length = min(len(c) for c in columns)
+        return np.array([c[:length] for c in columns])
@@ -0,0 +1,101 @@
+"""
+Pool training.
+One learner fed by every world of an EnvPool: each round the agent picks an action for every world,
+the pool steps them all in its worker processes, and the agent learns from every transition that comes back.
+Worlds run in parallel while the agent only does its own select and update work, so episodes come in about as many times
+faster as there are worker processes, and with a pool of map seeds every episode can be on a different map.
+
+The agent is any of the tabular agents, driven through its _select_action and _update (and _plan for Dyna-Q),
+and given the same transitions as stepping a world itself: the observation the step ended on as next state and,
+like Worker.act, never a terminal flag, so deliveries and step caps bootstrap the same way. States are decoded from the pool's int observations.
+Episode bookkeeping matches Engine, so its episode callbacks (ProgressLog, Checkpoint, EarlyStopping, MetricsRecorder) work here too.
+Per-step hooks are not called.
+
+"""
+
+# Imports
+from ants import obsCount, decodeState
+from env_pool import EnvPool
+
+
+# Episode loop over a pool of worlds
+class PoolTrainer(object):
+    pool: EnvPool
+    agent: object # Learns from every world's transitions
+    callbacks: list
+    decayEpsilon: bool # Decay the agent's epsilon after every finished episode
+    episode: int = 0 # Episodes finished so far
+    stop: bool = False # Set by a callback to end the run
+    rewards: list # Per episode total reward, in the order episodes finish
+    lengths: list # Per episode steps
+    deliveries: list # Per episode food delivered to the queen
+
+    # Initialize
+    def __init__(self, pool: EnvPool, agent: object, callbacks: list = None, decayEpsilon: bool = True):
+        self.pool = pool
+        self.agent = agent
+        self.callbacks = list(callbacks or [])
+        self.decayEpsilon = decayEpsilon
+        self.rewards = []
+        self.lengths = []
+        self.deliveries = []
+
+    # Run until `episodes` more episodes have finished, returns the trainer so its lists can be read off the call
+    # The round that finishes the run is learned from in full, episodes still going or finishing in it after the last one are dropped
+    def run(self, episodes: int) -> "PoolTrainer":
+        self.stop = False
+        agent = self.agent
+        pool = self.pool
+        interner = getattr(agent, "interner", None)
+        plan = getattr(agent, "_plan", None)
+        decay = getattr(agent, "decay_epsilon", None) if self.decayEpsilon else None
+        decoded = [decodeState(obs) for obs in range(obsCount)]
+        if interner is not None:
+            keyOf = lambda obs: interner.intern(decoded[obs])
+        else:
+            keyOf = decoded.__getitem__
+        for cb in self.callbacks:
+            cb.onRunStart(self)
+
+        n = pool.numEnvs
+        states = [keyOf(obs) for obs in pool.reset().tolist()]
+        totals = [0] * n
+        steps = [0] * n
+        target = self.episode + episodes
+        while self.episode < target and not self.stop:
+            actions = [agent._select_action(state) for state in states]
+            obs, rewards, terminated, truncated, _ = pool.step(actions)
+            obs = obs.tolist()
+            finalObs = pool.finalObs.tolist()
+            rewards = rewards.tolist()
+            terminated = terminated.tolist()
+            truncated = truncated.tolist()
+            for i in range(n):
+                # A finished world has already been reset, so learn from the observation the step really ended on
+                # and carry on from the next episode's start, Dyna-Q's model never links one episode to the next
+                reward = int(rewards[i])
+                agent._update(states[i], actions[i], reward, keyOf(finalObs[i]), False, False)
+                if plan is not None:
+                    plan()
+                states[i] = keyOf(obs[i])
+                totals[i] += reward
+                steps[i] += 1
+                # Once the run is over the rest of the round is still learned from, its episodes just aren't booked
+                if (terminated[i] or truncated[i]) and self.episode < target and not self.stop:
+                    self.endEpisode(totals[i], steps[i], int(terminated[i]), decay)
+                    totals[i] = 0
+                    steps[i] = 0
+        for cb in self.callbacks:
+            cb.onRunEnd(self)
+        return self
+
+    # Book a finished episode, in training an episode only terminates on a delivery
+    def endEpisode(self, reward: int, length: int, delivered: int, decay):
+        self.rewards.append(reward)
+        self.lengths.append(length)
+        self.deliveries.append(delivered)
+        if decay is not None:
+            decay()
+        for cb in self.callbacks:
+            cb.onEpisodeEnd(self)
+        self.episode += 1
@@ -0,0 +1,108 @@
+"""
+Per-phase step timing.
+A Profiler attached to a world (and its agent) adds up how long each phase of a step takes:
+the whole step, the ants acting, trail fading, the death sweep and rendering on the world side,
+and action selection, the environment step, the learning update and Dyna-Q planning on the agent side.
+Agent phases run inside the ants phase, so they're a breakdown of it rather than extra time.
+Totals are kept per episode, and summarized over the whole run.
+
+Nothing is timed unless a profiler is attached, then the world and agents only check for None.
+
+"""
+
+# Imports
+from time import perf_counter
+from engine import Callback, Engine
+from event_log import EventLog, INFO
+
+# Phases in the order they're reported
+worldPhases = ("step", "ants", "fade", "deaths", "render")
+agentPhases = ("select", "env", "update", "plan")
+
+
+# Phase timer
+class Profiler(object):
+    current: dict # Phase -> [seconds, count] of the episode running now
+    episodes: list # Phase -> seconds for every finished episode
+    totals: dict # Phase -> [seconds, count] over every finished episode
+
+    # Initialize
+    def __init__(self):
+        self.current = {}
+        self.episodes = []
+        self.totals = {}
+
+    # Attach to a world and optionally the agent it trains
+    def attach(self, world, agent=None):
+        world.profiler = self
+        if agent is not None:
+            agent.profiler = self
+
+    # Stop timing them
+    @staticmethod
+    def detach(world, agent=None):
+        world.profiler = None
+        if agent is not None:
+            agent.profiler = None
+
+    # Add time to a phase
+    def add(self, phase: str, seconds: float):
+        entry = self.current.get(phase)
+        if entry is None:
+            self.current[phase] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    # Close the running episode, its times go to the history and the totals
+    def endEpisode(self):
+        self.episodes.append({phase: entry[0] for phase, entry in self.current.items()})
+        for phase, (seconds, count) in self.current.items():
+            total = self.totals.setdefault(phase, [0.0, 0])
+            total[0] += seconds
+            total[1] += count
+        self.current = {}
+
+    # Phase -> {"total_s", "count", "mean_us", "share"} over the finished episodes
+    # Share is the fraction of all step time, agent phases included as part of it
+    def summary(self) -> dict:
+        stepTime = self.totals.get("step", [0.0, 0])[0]
+        out = {}
+        for phase in worldPhases + agentPhases + tuple(p for p in self.totals if p not in worldPhases + agentPhases):
+            if phase not in self.totals:
+                continue
+            seconds, count = self.totals[phase]
+            out[phase] = {
+                "total_s": seconds,
+                "count": count,
+                "mean_us": seconds / count * 1e6 if count > 0 else 0.0,
+                "share": seconds / stepTime if stepTime > 0 else 0.0,
+            }
+        return out
+
+    # Summary as a text table
+    def report(self) -> str:
+        lines = [f"{'phase':<8}{'total s':>10}{'calls':>10}{'mean us':>10}{'share':>8}"]
+        for phase, s in self.summary().items():
+            lines.append(f"{phase:<8}{s['total_s']:>10.3f}{s['count']:>10}{s['mean_us']:>10.2f}{s['share']:>8.1%}")
+        return "\n".join(lines)
+
+
+# Engine callback attaching a profiler for the run and closing its episodes
+# With a log, the run's summary goes to it at the end
+class ProfileEpisodes(Callback):
+    # Initialize
+    def __init__(self, profiler: Profiler = None, log: EventLog = None):
+        self.profiler = profiler if profiler is not None else Profiler()
+        self.log = log
+
+    def onRunStart(self, engine: Engine):
+        self.profiler.attach(engine.world, engine.agent)
+
+    def onEpisodeEnd(self, engine: Engine):
+        self.profiler.endEpisode()
+
+    def onRunEnd(self, engine: Engine):
+        Profiler.detach(engine.world, engine.agent)
+        if self.log is not None:
+            self.log.emit(INFO, "profile", msg=f"Step time by phase:\n{self.profiler.report()}", phases=self.profiler.summary())
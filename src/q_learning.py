@@ -5,13 +5,17 @@ Handles Q-table, action selection, and learning updates.
 
 import pickle
 from random import random, choice
+from time import perf_counter
 from typing import Dict, Tuple, Any, Optional
 
 
 class QLearningAgent:
+    profiler = None # Times select/env/update when a profiling.Profiler is attached
+    interner = None # state_interner.StateInterner the tables key states by, None keys them by the state tuples
+
     def __init__(self, learning_rate: float = 0.1, discount_factor: float = 0.9,
                  epsilon: float = 0.9, epsilon_decay: float = 1, min_epsilon: float = 0.01,
-                 n_actions: int = 5, seed: Optional[int] = None):
+                 n_actions: int = 5, seed: Optional[int] = None, interner=None):
         self.learning_rate = learning_rate
         self.discount_factor = discount_factor
         self.epsilon = epsilon
@@ -19,26 +23,18 @@ class QLearningAgent:
         self.min_epsilon = min_epsilon
         self.q_table: Dict[Tuple[Any, int], float] = {}
         self.n_actions = n_actions
+        self.interner = interner
 
-    def step(self, state: Tuple, env_step_func) -> Tuple[int, int, Tuple]:
-        # Perform complete Q-learning step: action selection, environment interaction, Q-update
-
-        # Args - state: Current state tuple, env_step_func: Function that takes action and returns (reward, next_state, terminated, truncated)
-
-        # Returns - (action, reward, next_state)
-
+    def _select_action(self, state: Tuple) -> int:
         # Epsilon-greedy action selection
         if random() < self.epsilon:
-            action = choice(range(self.n_actions))
-        else:
-            q_values = [self.q_table.get((state, a), 0.0) for a in range(self.n_actions)]
-            max_q = max(q_values)
-            best_actions = [a for a, q in enumerate(q_values) if q == max_q]
-            action = choice(best_actions)
-
-        # Environment step
-        reward, next_state, terminated, truncated = env_step_func(action)
+            return choice(range(self.n_actions))
+        q_values = [self.q_table.get((state, a), 0.0) for a in range(self.n_actions)]
+        max_q = max(q_values)
+        best_actions = [a for a, q in enumerate(q_values) if q == max_q]
+        return choice(best_actions)
 
+    def _update(self, state: Tuple, action: int, reward: float, next_state: Tuple, terminated: bool = False, truncated: bool = False) -> None:
         # Q-value update
         current_q = self.q_table.get((state, action), 0.0)
         # If episode terminates, next state has no future value
@@ -51,18 +47,53 @@ class QLearningAgent:
         new_q = current_q + self.learning_rate * td_error
         self.q_table[(state, action)] = new_q
 
+    def step(self, state: Tuple, env_step_func) -> Tuple[int, int, Tuple]:
+        # With an interner the tables work on state ids, states going in and out stay as they are
+        interner = self.interner
+        if interner is None:
+            return self._step(state, env_step_func)
+        action, reward, next_key = self._step(interner.intern(state), interner.wrap(env_step_func))
+        return action, reward, interner.states[next_key]
+
+    def _step(self, state: Tuple, env_step_func) -> Tuple[int, int, Tuple]:
+        # Perform complete Q-learning step: action selection, environment interaction, Q-update
+
+        # Args - state: Current state tuple, env_step_func: Function that takes action and returns (reward, next_state, terminated, truncated)
+
+        # Returns - (action, reward, next_state)
+
+        prof = self.profiler
+        if prof is None:
+            action = self._select_action(state)
+            reward, next_state, terminated, truncated = env_step_func(action)
+            self._update(state, action, reward, next_state, terminated, truncated)
+            return action, reward, next_state
+
+        # Same step with each part timed
+        t0 = perf_counter()
+        action = self._select_action(state)
+        t1 = perf_counter()
+        reward, next_state, terminated, truncated = env_step_func(action)
+        t2 = perf_counter()
+        self._update(state, action, reward, next_state, terminated, truncated)
+        prof.add("select", t1 - t0)
+        prof.add("env", t2 - t1)
+        prof.add("update", perf_counter() - t2)
         return action, reward, next_state
 
     def decay_epsilon(self):
         self.epsilon = max(self.min_epsilon, self.epsilon * self.epsilon_decay)
 
     def save_q_table(self, filename: str):
+        # Saved keyed by states, interned ids only mean something to this process's interner
+        table = self.q_table if self.interner is None else self.interner.expand(self.q_table)
         with open(filename, 'wb') as f:
-            pickle.dump(self.q_table, f)
+            pickle.dump(table, f)
 
     def load_q_table(self, filename: str):
         try:
             with open(filename, 'rb') as f:
-                self.q_table = pickle.load(f)
+                table = pickle.load(f)
+            self.q_table = table if self.interner is None else self.interner.internTable(table)
         except FileNotFoundError:
             print(f"Q-table file {filename} not found. Starting with empty Q-table.")
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""
+Headless frame rasterizer.
+Draws the grid into a NumPy RGB image without Pygame, for render_mode="rgb_array".
+Every pixel is mapped to its cell and to a ring around that cell's centre once per layout,
+so a frame is just a small colour table per cell and one gather over the pixels.
+The image and table are kept between frames and, like the animator's partial redraws, only the cells the grid reports
+as changed are recoloured and gathered again, so a frame costs about as much as the cells that changed plus one copy out.
+Colours match the Pygame animator.
+
+"""
+
+# Imports
+from hex_grid import HexGrid
+from math import sqrt
+import numpy as np
+
+# Colours, same as the animator
+obstacleColour = (63,63,63)
+queenColour = (255,0,0)
+workerColour = (191,0,0)
+foodColour = (255,127,0)
+
+
+# Cell size and grid origin that fit the whole world in the window
+# Shared with the Pygame animator so both draw the same picture
+def windowLayout(xR: int, yR: int, zR: int, windowSize: tuple[int, int]) -> tuple[float, tuple[float, float]]:
+    # Calculate how big to make each cell so it fits the window right
+    # I hate math
+    widthInCellRads = (yR + zR) * 1.5 - 1
+    heightInCellRads = ((xR * 2) + yR + zR - 2) * sqrt(0.75)
+    widthMaxCellRad = (windowSize[0] - 10) / widthInCellRads
+    heightMaxCellRad = (windowSize[1] - 10) / heightInCellRads
+    cellRad = min(widthMaxCellRad, heightMaxCellRad)
+
+    # Calulate grid positioning in the window
+    # I hate math
+    originXOffsetInCellRads = (widthInCellRads / 2) - (yR * 1.5 - 0.5)
+    originYOffsetInCellRads = (heightInCellRads / 2) - ((yR + zR - 1) * sqrt(0.75))
+    originX = (windowSize[0] / 2) + (originXOffsetInCellRads * cellRad)
+    originY = (windowSize[1] / 2) + (originYOffsetInCellRads * cellRad)
+    return cellRad, (originX,originY)
+
+
+# NumPy renderer
+class Rasterizer(object):
+    xR: int
+    yR: int
+    zR: int
+    windowSize: tuple # (width, height) in pixels
+    cellRad: float
+    origin: tuple
+    cellCount: int
+    pixelIndex: np.ndarray # For every pixel, the row of the colour table it takes
+    cellPixels: np.ndarray # Pixel numbers grouped by cell, cell k's run from cellStarts[k] to cellStarts[k + 1]
+    cellStarts: np.ndarray
+    grid: HexGrid = None # Grid the kept frame was drawn from, any other grid is drawn in full
+    table: np.ndarray # Colour table of the kept frame
+    image: np.ndarray # Kept frame, one row per pixel
+
+    # Initialize
+    def __init__(self, xR: int, yR: int, zR: int, windowSize: tuple[int, int] = (1250, 750)):
+        self.xR = xR
+        self.yR = yR
+        self.zR = zR
+        self.windowSize = windowSize
+        self.cellRad, self.origin = windowLayout(xR, yR, zR, windowSize)
+        self.buildMask()
+
+    # Work out which cell and ring every pixel belongs to
+    def buildMask(self):
+        w, h = self.windowSize
+        r = self.cellRad
+        rS = r * sqrt(0.75)
+        coords = HexGrid(self.xR, self.yR, self.zR).flatCoords()
+        labels = np.full(w * h, -1, dtype=np.int32)
+        rings = np.zeros(w * h, dtype=np.uint8)
+        for index, c in enumerate(coords):
+            cX = self.origin[0] + ((c[1] - c[2]) * 1.5 * r)
+            cY = self.origin[1] - (((c[0] * 2) - c[1] - c[2]) * rS)
+            # Pixel centres in the bounding box
+            x0, x1 = max(int(cX - r), 0), min(int(cX + r) + 1, w)
+            y0, y1 = max(int(cY - rS), 0), min(int(cY + rS) + 1, h)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            dX = np.arange(x0, x1) + 0.5 - cX
+            dY = (np.arange(y0, y1) + 0.5 - cY)[:, None]
+            # Flat-topped hexagon test, then how far in from the centre
+            inside = (np.abs(dY) <= rS) & (rS * np.abs(dX) + 0.5 * r * np.abs(dY) <= r * rS)
+            dist = np.sqrt(dX * dX + dY * dY)
+            ring = np.where(dist <= r * 0.5, 2, np.where(dist <= rS, 1, 0))
+            rows, cols = np.nonzero(inside)
+            flat = (rows + y0) * w + (cols + x0)
+            labels[flat] = index
+            rings[flat] = ring[rows, cols]
+        # Colour table rows are cell * 3 + ring, with one black row at the end for pixels off the grid
+        self.cellCount = len(coords)
+        self.pixelIndex = np.where(labels >= 0, labels * 3 + rings, self.cellCount * 3).astype(np.intp)
+        # Each cell's pixels in one run, for redrawing single cells
+        self.cellPixels = np.argsort(labels, kind="stable")
+        self.cellStarts = np.searchsorted(labels[self.cellPixels], np.arange(self.cellCount + 1)).astype(np.intp)
+        self.grid = None
+
+    # Colour the table rows of the given cells, from their values in the same order
+    def paint(self, index: np.ndarray, cells: np.ndarray, trails: np.ndarray, carriers: set):
+        t = np.clip(255 - trails, 0, 255).astype(np.uint8)
+        rows = np.zeros((len(index), 3, 3), dtype=np.uint8)
+        rows[:, :, 0] = t[:, None]
+        rows[:, :, 1] = 255
+        rows[:, :, 2] = t[:, None]
+        rows[cells == ord("O")] = obstacleColour
+        rows[cells == ord("Q"), 1:] = queenColour
+        rows[cells == ord("W"), 1:] = workerColour
+        rows[cells == ord("F"), 2] = foodColour
+        if carriers: # Workers carrying food
+            rows[np.isin(index, list(carriers)), 2] = foodColour
+        self.table[index] = rows
+
+    # Draw the grid, and ants carrying food, into an (height, width, 3) uint8 image
+    # The first frame of a grid is drawn in full and starts tracking its changes, later ones only redraw what changed
+    def frame(self, grid: HexGrid, colony: list = None) -> np.ndarray:
+        carriers = set()
+        if colony is not None:
+            carriers = {grid.flatIndex((ant.x,ant.y,ant.z)) for ant in colony[1:] if getattr(ant, "hasFood", False)}
+        if grid is not self.grid or grid.dirty is None: # Fresh grid, draw it all and watch it from here on
+            self.grid = grid
+            grid.trackChanges()
+            cells = np.frombuffer("".join(grid.flatCells()).encode("ascii"), dtype=np.uint8)
+            trails = np.asarray(grid.flatTrails(), dtype=np.int32)
+            self.table = np.zeros((self.cellCount + 1, 3, 3), dtype=np.uint8)
+            self.paint(np.arange(self.cellCount), cells, trails, carriers)
+            self.image = np.take(self.table.reshape(-1, 3), self.pixelIndex, axis=0)
+        else: # Only what changed since the last frame
+            dirty = grid.takeDirty()
+            if dirty:
+                coords = list(dirty)
+                index = np.fromiter((grid.flatIndex(c) for c in coords), dtype=np.intp, count=len(coords))
+                cells = np.frombuffer("".join([grid.getCell(c) for c in coords]).encode("ascii"), dtype=np.uint8)
+                trails = np.fromiter((grid.getTrail(c) for c in coords), dtype=np.int32, count=len(coords))
+                self.paint(index, cells, trails, carriers)
+                # Every pixel of the changed cells, their runs laid end to end
+                starts = self.cellStarts[index]
+                lengths = self.cellStarts[index + 1] - starts
+                offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+                pixels = self.cellPixels[offsets + np.arange(offsets.size)]
+                self.image[pixels] = self.table.reshape(-1, 3)[self.pixelIndex[pixels]]
+        # A copy, so frames handed out earlier don't change under the caller
+        return self.image.reshape(self.windowSize[1], self.windowSize[0], 3).copy()
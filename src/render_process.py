@@ -0,0 +1,87 @@
+"""
+Background rendering.
+Runs the Pygame animator in its own process so watching a run doesn't slow the simulation down.
+The world hands over flat grid snapshots through a small bounded queue at most once per frame,
+and when the window falls behind the newest snapshot is dropped instead of waiting.
+
+"""
+
+# Imports
+import multiprocessing as mp
+import queue
+import time
+
+
+# Render process loop
+# Redraws the window from each snapshot and keeps it responsive between them
+def renderLoop(frames, xR: int, yR: int, zR: int, windowSize: tuple[int, int]):
+    from hex_grid import HexGrid
+    import window_animator
+    import pygame
+
+    animator = window_animator.Animator(xR, yR, zR, windowSize)
+    grid = HexGrid(xR, yR, zR)
+    coords = animator.coords
+    try:
+        while True:
+            try:
+                frame = frames.get(timeout = 1.0 / animator.TARGET_FPS)
+            except queue.Empty:
+                frame = False
+            if frame is None: # Closed from the simulation side
+                break
+            if any(event.type == pygame.QUIT for event in pygame.event.get()):
+                break
+            if frame is False:
+                continue
+            cells, trails, carriers = frame
+            grid.loadFlat(cells.decode("ascii"), trails)
+            animator.drawFullGrid(grid, {coords[i] for i in carriers})
+            animator.updateWindow()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        animator.closeWindow()
+
+
+# Simulation side handle
+class RenderProcess(object):
+    frameTime: float # Minimum time between snapshots
+    lastSubmit: float = 0
+    dropped: int = 0 # Snapshots skipped because the window was behind
+
+    # Initialize
+    def __init__(self, xR: int, yR: int, zR: int, windowSize: tuple[int, int], fps: int = 30, maxQueue: int = 2):
+        ctx = mp.get_context()
+        self.frameTime = 1.0 / fps
+        self.frames = ctx.Queue(maxsize = maxQueue)
+        self.proc = ctx.Process(target = renderLoop, args = (self.frames, xR, yR, zR, windowSize), daemon = True)
+        self.proc.start()
+
+    # Queue a snapshot of the grid if a frame is due and there's room, never blocks
+    def submit(self, grid, colony: list, force: bool = False) -> bool:
+        now = time.perf_counter()
+        if not force and now - self.lastSubmit < self.frameTime:
+            return False
+        if self.frames.full():
+            self.dropped += 1
+            return False
+        carriers = [grid.flatIndex((ant.x,ant.y,ant.z)) for ant in colony[1:] if getattr(ant, "hasFood", False)]
+        snapshot = ("".join(grid.flatCells()).encode("ascii"), grid.flatTrails(), carriers)
+        try:
+            self.frames.put_nowait(snapshot)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.lastSubmit = now
+        return True
+
+    def close(self):
+        if self.proc.is_alive():
+            try:
+                self.frames.put(None, timeout = 1)
+            except queue.Full:
+                pass
+            self.proc.join(timeout = 5)
+            if self.proc.is_alive():
+                self.proc.terminate()
@@ -0,0 +1,58 @@
+"""
+Persistent experiment results.
+Every finished run is written straight away as its own JSON file, named by a hash of its full config (seed included),
+so an interrupted or extended sweep can skip whatever already finished.
+Files are written to a temporary name and renamed into place, so a crash never leaves half of one behind.
+
+"""
+
+# Imports
+import hashlib
+import json
+import os
+import tempfile
+
+
+# Directory of finished runs
+class ResultStore(object):
+    root: str # Directory holding one file per run
+
+    # Initialize
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    # Hash of a config, the same whatever order its keys are in
+    def key(self, config: dict) -> str:
+        return hashlib.sha1(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key + ".json")
+
+    def __contains__(self, config: dict) -> bool:
+        return os.path.exists(self.path(self.key(config)))
+
+    # Stored run as {"config", "summary", "series"}, None if it hasn't finished yet
+    def get(self, config: dict) -> dict:
+        try:
+            with open(self.path(self.key(config))) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    # Store a finished run, summary holds single numbers and series per-episode lists
+    def put(self, config: dict, summary: dict, series: dict):
+        entry = {"config": config, "summary": summary, "series": series}
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(entry, f, default=float)
+        os.replace(tmp, self.path(self.key(config)))
+
+    # Every stored run
+    def entries(self) -> list[dict]:
+        out = []
+        for name in sorted(os.listdir(self.root)):
+            if name.endswith(".json"):
+                with open(os.path.join(self.root, name)) as f:
+                    out.append(json.load(f))
+        return out
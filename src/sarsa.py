@@ -5,10 +5,14 @@ On-policy TD control using epsilon-greedy behavior/target.
 
 import pickle
 import random
+from time import perf_counter
 from typing import Dict, Tuple, Any, Optional
 
 
 class SARSAAgent:
+    profiler = None # Times select/env/update when a profiling.Profiler is attached
+    interner = None # state_interner.StateInterner the tables key states by, None keys them by the state tuples
+
     def __init__(
         self,
         learning_rate: float = 0.1,
@@ -18,6 +22,7 @@ class SARSAAgent:
         min_epsilon: float = 0.01,
         n_actions: int = 5,
         seed: Optional[int] = None,
+        interner=None,
     ):
         self.learning_rate = learning_rate
         self.discount_factor = discount_factor
@@ -27,6 +32,7 @@ class SARSAAgent:
         self.n_actions = n_actions
         self.q_table: Dict[Tuple[Any, int], float] = {}
         self.rng = random.Random(seed)
+        self.interner = interner
 
     def _select_action(self, state: Tuple) -> int:
         if self.rng.random() < self.epsilon:
@@ -36,11 +42,7 @@ class SARSAAgent:
         best_actions = [a for a, q in enumerate(q_values) if q == max_q]
         return self.rng.choice(best_actions)
 
-    def step(self, state: Tuple, env_step_func) -> Tuple[int, int, Tuple]:
-        # On-policy SARSA update using the next epsilon-greedy action with terminal handling.
-        action = self._select_action(state)
-        reward, next_state, terminated, truncated = env_step_func(action)
-
+    def _update(self, state: Tuple, action: int, reward: float, next_state: Tuple, terminated: bool = False, truncated: bool = False) -> None:
         # Only bootstrap if the episode continues.
         if terminated or truncated:
             td_target = reward
@@ -53,18 +55,48 @@ class SARSAAgent:
         td_error = td_target - current_q
         self.q_table[(state, action)] = current_q + self.learning_rate * td_error
 
+    def step(self, state: Tuple, env_step_func) -> Tuple[int, int, Tuple]:
+        # With an interner the tables work on state ids, states going in and out stay as they are
+        interner = self.interner
+        if interner is None:
+            return self._step(state, env_step_func)
+        action, reward, next_key = self._step(interner.intern(state), interner.wrap(env_step_func))
+        return action, reward, interner.states[next_key]
+
+    def _step(self, state: Tuple, env_step_func) -> Tuple[int, int, Tuple]:
+        # On-policy SARSA update using the next epsilon-greedy action with terminal handling.
+        prof = self.profiler
+        if prof is None:
+            action = self._select_action(state)
+            reward, next_state, terminated, truncated = env_step_func(action)
+            self._update(state, action, reward, next_state, terminated, truncated)
+            return action, reward, next_state
+
+        # Same step with each part timed
+        t0 = perf_counter()
+        action = self._select_action(state)
+        t1 = perf_counter()
+        reward, next_state, terminated, truncated = env_step_func(action)
+        t2 = perf_counter()
+        self._update(state, action, reward, next_state, terminated, truncated)
+        prof.add("select", t1 - t0)
+        prof.add("env", t2 - t1)
+        prof.add("update", perf_counter() - t2)
         return action, reward, next_state
 
     def decay_epsilon(self):
         self.epsilon = max(self.min_epsilon, self.epsilon * self.epsilon_decay)
 
     def save_q_table(self, filename: str):
+        # Saved keyed by states, interned ids only mean something to this process's interner
+        table = self.q_table if self.interner is None else self.interner.expand(self.q_table)
         with open(filename, 'wb') as f:
-            pickle.dump(self.q_table, f)
+            pickle.dump(table, f)
 
     def load_q_table(self, filename: str):
         try:
             with open(filename, 'rb') as f:
-                self.q_table = pickle.load(f)
+                table = pickle.load(f)
+            self.q_table = table if self.interner is None else self.interner.internTable(table)
         except FileNotFoundError:
             print(f"Q-table file {filename} not found. Starting with empty Q-table.")
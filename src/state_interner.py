@@ -0,0 +1,88 @@
+"""
+State interning for the tabular agents.
+Every observation tuple a worker makes is a new object, and every (state, action) key and Dyna-Q model entry holds its own.
+An interner keeps each distinct state once and hands out a small int for it, which the agent's tables use instead.
+One interner can be shared by many agents in a process, so a state seen by all of them is still only stored once.
+
+Opt in by passing interner=StateInterner() to an agent, what goes in and out of its step is unchanged.
+Tables of an interned agent hold ids, expand() turns them back into state keys for anything that reads states or outlives the process,
+such as saved Q-tables, and internTable() turns a saved table back into ids.
+
+"""
+
+# Imports
+import sys
+
+
+# Distinct states and their ids
+class StateInterner(object):
+    ids: dict # State -> id
+    states: list # Id -> state
+
+    # Initialize
+    def __init__(self):
+        self.ids = {}
+        self.states = []
+
+    # Id of a state, new states get the next one
+    def intern(self, state: tuple) -> int:
+        key = self.ids.get(state)
+        if key is None:
+            key = len(self.states)
+            self.ids[state] = key
+            self.states.append(state)
+        return key
+
+    # Environment step function handing back interned next states
+    def wrap(self, env_step_func):
+        def step(action: int):
+            reward, next_state, terminated, truncated = env_step_func(action)
+            return reward, self.intern(next_state), terminated, truncated
+        return step
+
+    # Copy of a (state id, action) table with the states put back
+    def expand(self, table: dict) -> dict:
+        states = self.states
+        return {(states[key[0]], key[1]): value for key, value in table.items()}
+
+    # Copy of a (state, action) table keyed by state ids instead, the other way round from expand
+    def internTable(self, table: dict) -> dict:
+        intern = self.intern
+        return {(intern(key[0]), key[1]): value for key, value in table.items()}
+
+    def __len__(self) -> int:
+        return len(self.states)
+
+
+# Bytes held by an object and everything in it, every object counted once however often it's referenced
+# Objects in `seen` are skipped, pass the same set to leave out what was already counted
+def deepSize(obj, seen: set = None) -> int:
+    if seen is None:
+        seen = set()
+    size = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen:
+            continue
+        seen.add(id(o))
+        size += sys.getsizeof(o)
+        if isinstance(o, dict):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (tuple, list, set, frozenset)):
+            stack.extend(o)
+    return size
+
+
+# Memory of an agent's tables in bytes: "q_table", "model" for Dyna-Q and "interner" when it has one
+# Shared objects are counted with whatever is reported first
+def footprint(agent) -> dict:
+    seen = set()
+    out = {"q_table": deepSize(agent.q_table, seen)}
+    if hasattr(agent, "model"):
+        out["model"] = deepSize(agent.model, seen)
+    if getattr(agent, "interner", None) is not None:
+        out["interner"] = deepSize(agent.interner.ids, seen) + deepSize(agent.interner.states, seen)
+    out["total"] = sum(out.values())
+    return out
@@ -0,0 +1,176 @@
+"""
+Episode trajectory recording and replay.
+The recorder streams a compact binary log of every worker action taken in a world,
+the replayer rebuilds any logged episode step by step from it without any learning agents.
+
+Log layout, little endian:
+header   "HGTR", version, train, worldType, xR, yR, zR, world seed (-1 if none), map length, map
+episode  "E", episode index, episode seed
+step     "S", record count, then per record: ant index, action, reward, resulting x, y, z
+
+A recorded world reseeds itself from a fresh episode seed on every reset,
+so the world's own randomness (spawns, which food gets picked up) can be played back exactly.
+Random maps are stored in the header, so they don't need to be regenerated.
+
+"""
+
+# Imports
+import mmap
+import struct
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from hex_grid_world import HexGridWorld
+
+MAGIC = b"HGTR"
+VERSION = 1
+headerFormat = struct.Struct("<4sBBBIIIqI")
+episodeFormat = struct.Struct("<cIQ")
+stepFormat = struct.Struct("<cH")
+recordFormat = struct.Struct("<HBbIII")
+
+
+# Writes the log
+class TrajectoryRecorder(object):
+    path: str
+    episode: int = -1 # Index of the episode being recorded
+    records: list # Records for the step in progress
+
+    # Initialize
+    def __init__(self, path: str):
+        self.path = path
+        self.file = open(path, "wb", buffering = 1 << 16)
+        self.records = []
+        self.started = False
+
+    # Write the header, called by the world when the recorder is attached
+    def begin(self, world: "HexGridWorld"):
+        if self.started:
+            return
+        self.started = True
+        worldMap = "".join(world.gridMemory).encode("ascii") if world.gridMemory is not None else b""
+        seed = world.worldSeed if world.worldSeed is not None else -1
+        self.file.write(headerFormat.pack(MAGIC, VERSION, int(world.train), world.worldType, world.xR, world.yR, world.zR, seed, len(worldMap)))
+        self.file.write(worldMap)
+
+    def beginEpisode(self, seed: int):
+        self.episode += 1
+        self.file.write(episodeFormat.pack(b"E", self.episode, seed))
+
+    # One worker action
+    def record(self, antId: int, action: int, reward: int, x: int, y: int, z: int):
+        self.records.append(recordFormat.pack(antId, action, reward, x, y, z))
+
+    def endStep(self):
+        self.file.write(stepFormat.pack(b"S", len(self.records)))
+        self.file.write(b"".join(self.records))
+        self.records = []
+
+    def close(self):
+        if not self.file.closed:
+            self.file.close()
+
+
+# Stands in for the Q-agent during replay, handing out the logged actions in order
+class ReplayAgent(object):
+    # Initialize
+    def __init__(self):
+        self.actions = []
+        self.next = 0
+
+    def step(self, state, env_step_func):
+        action = self.actions[self.next]
+        self.next += 1
+        reward, next_state, _, _ = env_step_func(action)
+        return action, reward, next_state
+
+
+# Reads the log back
+class TrajectoryReplay(object):
+    train: bool
+    worldType: int
+    xR: int
+    yR: int
+    zR: int
+    worldSeed: int = None
+    worldMap: list = None # Memorized random map, None for preset worlds
+    episodeOffsets: list # Byte offset of each episode's first step
+    episodeSeeds: list
+
+    # Initialize
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self.data = mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ)
+        magic, version, train, self.worldType, self.xR, self.yR, self.zR, seed, mapLen = headerFormat.unpack_from(self.data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} trajectory log")
+        self.train = bool(train)
+        if seed >= 0:
+            self.worldSeed = seed
+        pos = headerFormat.size
+        if mapLen > 0:
+            self.worldMap = list(self.data[pos:pos + mapLen].decode("ascii"))
+        pos += mapLen
+
+        # Index the episodes
+        self.episodeOffsets = []
+        self.episodeSeeds = []
+        while pos < len(self.data):
+            tag = self.data[pos:pos + 1]
+            if tag == b"E":
+                _, _, seed = episodeFormat.unpack_from(self.data, pos)
+                pos += episodeFormat.size
+                self.episodeOffsets.append(pos)
+                self.episodeSeeds.append(seed)
+            elif tag == b"S":
+                _, count = stepFormat.unpack_from(self.data, pos)
+                pos += stepFormat.size + count * recordFormat.size
+            else:
+                raise ValueError(f"Corrupt trajectory log at byte {pos}")
+
+    def episodeCount(self) -> int:
+        return len(self.episodeOffsets)
+
+    # Logged steps of one episode, each a list of (ant index, action, reward, (x, y, z))
+    def steps(self, episode: int):
+        pos = self.episodeOffsets[episode]
+        while pos < len(self.data) and self.data[pos:pos + 1] == b"S":
+            _, count = stepFormat.unpack_from(self.data, pos)
+            pos += stepFormat.size
+            records = []
+            for _ in range(count):
+                antId, action, reward, x, y, z = recordFormat.unpack_from(self.data, pos)
+                records.append((antId, action, reward, (x, y, z)))
+                pos += recordFormat.size
+            yield records
+
+    # Fresh world set up like the logged one
+    def buildWorld(self) -> "HexGridWorld":
+        from hex_grid_world import HexGridWorld
+        world = HexGridWorld(self.train, self.worldType, self.xR, self.yR, self.zR, seed = self.worldSeed)
+        if self.worldMap is not None:
+            world.gridMemory = self.worldMap
+        return world
+
+    # Play an episode back, yielding the world after every step so it can be drawn or inspected
+    # A world passed in must not be in Gymnasium mode, its workers are driven through their agents
+    # Raises if the world doesn't end up where the log says it did
+    def replay(self, episode: int, world: "HexGridWorld" = None):
+        if world is None:
+            world = self.buildWorld()
+        world.reset(seed = self.episodeSeeds[episode])
+        agent = ReplayAgent()
+        for stepIndex, records in enumerate(self.steps(episode)):
+            # Only the ants that acted in the log get an agent this step
+            acting = {antId for antId, _, _, _ in records}
+            for antId, ant in enumerate(world.colony):
+                if antId > 0:
+                    ant.q_agent = agent if antId in acting else None
+            agent.actions = [action for _, action, _, _ in records]
+            agent.next = 0
+            world.step(None)
+            for antId, action, reward, c in records:
+                ant = world.colony[antId] if antId < len(world.colony) else None
+                if ant is not None and (ant.x, ant.y, ant.z) != c and ant.age < 5000:
+                    raise RuntimeError(f"Replay of episode {episode} diverged at step {stepIndex}: ant {antId} at {(ant.x, ant.y, ant.z)}, log says {c}")
+            yield world
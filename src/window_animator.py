@@ -1,14 +1,20 @@
 """
 Pygame animation window handler.
+Cell positions are worked out once per window layout and every cell look is a cached sprite,
+so drawing a cell is a single blit.
 
 """
 
 # Imports
 from hex_grid import HexGrid
+from rasterizer import windowLayout
 import pygame
-from math import sqrt
+from math import sqrt, ceil
 import time
 
+rS34 = sqrt(0.75) # Hexagon half height over radius
+trailStep = 8 # Trail values per sprite shade, 250 / 8 gives 32 shades
+
 
 # Animator with frame rate control
 class Animator(object):
@@ -22,6 +28,14 @@ class Animator(object):
     cellRad: float
     origin: tuple
     last_frame_time: float = 0
+    dirtyRects: list = None # Screen areas drawn since the last display update, None means the whole window
+    coords: list # Every cell coord in drawing order
+    order: dict # Coord to its place in drawing order
+    cellRects: dict # Coord to the screen area its sprite is blitted to
+    overlaps: dict # Coord to every cell whose sprite overlaps its area, itself included, in drawing order, filled in as needed
+    buckets: dict # Sprite sized screen squares to the cells whose areas start in them, for finding overlaps
+    spriteSize: tuple # (width, height) of every sprite
+    sprites: dict # (cell type, trail shade, carrying food) to pre-drawn sprite
     
     # Initialize
     def __init__(self, xR: int, yR: int, zR: int, windowSize: tuple[int, int]):
@@ -39,21 +53,24 @@ class Animator(object):
         self.window = pygame.display.set_mode(windowSize)
         self.windowSize = windowSize
         
-        # Calculate how big to make each cell so it fits the window right
-        # I hate math
-        widthInCellRads = (self.yR + self.zR) * 1.5 - 1
-        heightInCellRads = ((self.xR * 2) + self.yR + self.zR - 2) * sqrt(0.75)
-        widthMaxCellRad = (windowSize[0] - 10) / widthInCellRads
-        heightMaxCellRad = (windowSize[1] - 10) / heightInCellRads
-        self.cellRad = min(widthMaxCellRad, heightMaxCellRad)
+        # Cell size and grid positioning, same as the headless rasterizer
+        self.cellRad, self.origin = windowLayout(self.xR, self.yR, self.zR, windowSize)
 
-        # Calulate grid positioning in the window
-        # I hate math
-        originXOffsetInCellRads = (widthInCellRads / 2) - (self.yR * 1.5 - 0.5)
-        originYOffsetInCellRads = (heightInCellRads / 2) - ((self.yR + self.zR - 1) * sqrt(0.75))
-        originX = (windowSize[0] / 2) + (originXOffsetInCellRads * self.cellRad)
-        originY = (windowSize[1] / 2) + (originYOffsetInCellRads * self.cellRad)
-        self.origin = (originX,originY)
+        # Geometry cache, where every cell's sprite goes
+        r = self.cellRad
+        self.spriteSize = (int(ceil(r * 2)) + 2, int(ceil(r * rS34 * 2)) + 2)
+        self.coords = HexGrid(self.xR, self.yR, self.zR).flatCoords()
+        self.order = {c: i for i, c in enumerate(self.coords)}
+        self.cellRects = {}
+        for c in self.coords:
+            wX, wY = self.convertGridCoord(c)
+            self.cellRects[c] = pygame.Rect(round(wX - self.spriteSize[0] / 2), round(wY - self.spriteSize[1] / 2), self.spriteSize[0], self.spriteSize[1])
+        self.sprites = {}
+        self.overlaps = {}
+        self.buckets = {}
+        for c in self.coords:
+            rect = self.cellRects[c]
+            self.buckets.setdefault((rect.x // self.spriteSize[0], rect.y // self.spriteSize[1]), []).append(c)
     
     # Close window, currently unused - gotta fix this
     def closeWindow(self):
@@ -67,64 +84,104 @@ class Animator(object):
         elapsed = current_time - self.last_frame_time
 
         if elapsed >= frame_time:
-            pygame.display.update()
+            if self.dirtyRects is None:
+                pygame.display.update()
+            else:
+                pygame.display.update(self.dirtyRects)
+            self.dirtyRects = []
             self.last_frame_time = current_time
     
-    # Update the display for one cell
-    def drawCell(self, grid: HexGrid, c: tuple[int, int, int], antDir: int = 0, antHasFood: bool = False):
-        # Where to put it
-        wXY = self.convertGridCoord(c)
-        wX, wY = wXY[0], wXY[1]
+    # Pre-drawn look of one cell, made the first time it's needed
+    def sprite(self, cell: str, shade: int, antHasFood: bool) -> pygame.Surface:
+        key = (cell, shade, antHasFood)
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            return sprite
 
-        # Points for the hexagon polygon
+        # Points for the hexagon polygon, around the sprite centre
         r = self.cellRad
         rH = r / 2
-        rS = r * sqrt(0.75)
-        p1 = (wX - r, wY)
-        p2 = (wX - rH, wY - rS)
-        p3 = (wX + rH, wY - rS)
-        p4 = (wX + r, wY)
-        p5 = (wX + rH, wY + rS)
-        p6 = (wX - rH, wY + rS)
-        hexagon = (p1, p2, p3, p4, p5, p6)
-
-        # Convenience
-        cell = grid.getCell(c)
-        trail = grid.getTrail(c)
+        rS = r * rS34
+        wX, wY = self.spriteSize[0] / 2, self.spriteSize[1] / 2
+        wXY = (wX, wY)
+        hexagon = ((wX - r, wY), (wX - rH, wY - rS), (wX + rH, wY - rS), (wX + r, wY), (wX + rH, wY + rS), (wX - rH, wY + rS))
+        sprite = pygame.Surface(self.spriteSize, pygame.SRCALPHA)
 
         # Cell background
         hexagonColour = (63,63,63) # Obstacle, default
         if cell != "O": # Show trail
-            t = max(0, 255 - trail)
+            t = max(0, 255 - shade * trailStep)
             hexagonColour = (t,255,t)
-        pygame.draw.polygon(self.window, hexagonColour, hexagon)
+        pygame.draw.polygon(sprite, hexagonColour, hexagon)
 
         # On top of background
         if cell == "Q": # Queen
-            pygame.draw.circle(self.window, (255,0,0), wXY, rS)
+            pygame.draw.circle(sprite, (255,0,0), wXY, rS)
         elif cell == "W": # Worker, can be shown carrying food
-            pygame.draw.circle(self.window, (191,0,0), wXY, rS)
+            pygame.draw.circle(sprite, (191,0,0), wXY, rS)
             if antHasFood:
-                pygame.draw.circle(self.window, (255,127,0), wXY, rH)
+                pygame.draw.circle(sprite, (255,127,0), wXY, rH)
         elif cell == "F": # Food
-            pygame.draw.circle(self.window, (255,127,0), wXY, rH)
+            pygame.draw.circle(sprite, (255,127,0), wXY, rH)
+        sprite = sprite.convert_alpha()
+        self.sprites[key] = sprite
+        return sprite
+
+    # Update the display for one cell
+    # Returns the screen area it covers
+    def drawCell(self, grid: HexGrid, c: tuple[int, int, int], antDir: int = 0, antHasFood: bool = False) -> pygame.Rect:
+        cell = grid.getCell(c)
+        shade = 0 if cell == "O" else (min(grid.getTrail(c), 255) + trailStep - 1) // trailStep
+        rect = self.cellRects[c]
+        self.window.blit(self.sprite(cell, shade, antHasFood and cell == "W"), rect)
+        return rect
+
+    # Cells whose sprites reach into a cell's area, in drawing order
+    # Sprites are padded squares, so neighbours' corners cover each other's edges
+    def overlapping(self, c: tuple[int, int, int]) -> list:
+        out = self.overlaps.get(c)
+        if out is None:
+            rect = self.cellRects[c]
+            bX, bY = rect.x // self.spriteSize[0], rect.y // self.spriteSize[1]
+            out = [o for dX in (-1, 0, 1) for dY in (-1, 0, 1) for o in self.buckets.get((bX + dX, bY + dY), ()) if self.cellRects[o].colliderect(rect)]
+            out.sort(key = self.order.__getitem__)
+            self.overlaps[c] = out
+        return out
+
+    # Redraw only the given cells, the next window update then only pushes their areas
+    # Each area is redrawn with every sprite reaching into it, clipped to it and in full redraw order,
+    # so shared edge pixels come out exactly as drawFullGrid draws them whatever order the cells come in
+    # carriers holds the coords of workers currently carrying food
+    def drawCells(self, grid: HexGrid, cells, carriers: set = frozenset()):
+        window = self.window
+        rects = []
+        for c in cells:
+            rect = self.cellRects[c]
+            window.set_clip(rect)
+            for o in self.overlapping(c):
+                self.drawCell(grid, o, antHasFood = o in carriers)
+            rects.append(rect)
+        window.set_clip(None)
+        if self.dirtyRects is not None:
+            self.dirtyRects += rects
     
     # Update the whole world display
-    def drawFullGrid(self, grid: HexGrid):
-        self.drawCell(grid, (0,0,0))
-        for i in range(self.xR):
-            for ii in range(1, self.yR):
-                self.drawCell(grid, (i,ii,0))
-        for i in range(self.yR):
-            for ii in range(1, self.zR):
-                self.drawCell(grid, (0,i,ii))
-        for i in range(self.zR):
-            for ii in range(1, self.xR):
-                self.drawCell(grid, (ii,0,i))
+    # carriers holds the coords of workers currently carrying food
+    def drawFullGrid(self, grid: HexGrid, carriers: set = frozenset()):
+        self.dirtyRects = None
+        cells = grid.flatCells()
+        trails = grid.flatTrails()
+        sprites = self.sprites
+        blits = []
+        for c, cell, trail in zip(self.coords, cells, trails):
+            key = (cell, 0 if cell == "O" else (min(trail, 255) + trailStep - 1) // trailStep, cell == "W" and c in carriers)
+            sprite = sprites.get(key) or self.sprite(*key)
+            blits.append((sprite, self.cellRects[c]))
+        self.window.blits(blits, doreturn = False)
     
     # Convert an XYZ grid coord to an XY window coord
     # I hate math
     def convertGridCoord(self, c: tuple[int, int, int]) -> tuple[int, int]:
         wX = self.origin[0] + ((c[1] - c[2]) * 1.5 * self.cellRad)
-        wY = self.origin[1] - (((c[0] * 2) - c[1] - c[2]) * sqrt(0.75) * self.cellRad)
+        wY = self.origin[1] - (((c[0] * 2) - c[1] - c[2]) * rS34 * self.cellRad)
         return (wX,wY)
@@ -0,0 +1,122 @@
+"""
+World files and the on-disk world cache.
+A world file holds a grid's dimensions, cell codes and trails as flat arrays (HexGrid.flatCells order),
+laid out so both arrays can be memory mapped straight from disk.
+The cache keeps one file per (seed, requested dimensions), both generators make the same map from them,
+so sweeps and parallel workers asking for the same random map load it instead of generating it again.
+
+File layout, little endian:
+header  "HGW1", xR, yR, zR, cell count, random state length (uint32 each), padded to 32 bytes
+cells   uint8 ASCII cell codes, padded to 8 bytes
+trails  int16 trail values, padded to 8 bytes
+random  uint32 Mersenne Twister state of the world's random source after generation, if stored
+
+"""
+
+# Imports
+import hashlib
+import os
+import random
+import struct
+import tempfile
+import numpy as np
+from hex_grid import HexGrid
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from hex_grid_world import HexGridWorld
+
+MAGIC = b"HGW1"
+headerFormat = struct.Struct("<4sIIIII")
+headerSize = 32
+
+
+# Round up to the next multiple of 8
+def padded(n: int) -> int:
+    return (n + 7) // 8 * 8
+
+
+# Write a world file, atomically so readers never see half of one
+def saveWorldFile(path: str, xR: int, yR: int, zR: int, cells, trails = None, rngState: tuple = None):
+    cells = np.frombuffer("".join(cells).encode("ascii"), dtype=np.uint8) if not isinstance(cells, np.ndarray) else cells.astype(np.uint8)
+    count = len(cells)
+    trails = np.zeros(count, dtype="<i2") if trails is None else np.asarray(trails, dtype="<i2")
+    state = np.asarray(rngState[1], dtype="<u4") if rngState is not None else np.zeros(0, dtype="<u4")
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(headerFormat.pack(MAGIC, xR, yR, zR, count, len(state)).ljust(headerSize, b"\0"))
+        f.write(cells.tobytes().ljust(padded(count), b"\0"))
+        f.write(trails.tobytes().ljust(padded(count * 2), b"\0"))
+        f.write(state.tobytes())
+    os.replace(tmp, path)
+
+
+# Memory map a world file
+# Returns (xR, yR, zR), cells as uint8 codes, trails as int16, and the random state or None
+def loadWorldFile(path: str) -> tuple[tuple[int, int, int], np.ndarray, np.ndarray, tuple]:
+    with open(path, "rb") as f:
+        magic, xR, yR, zR, count, stateLen = headerFormat.unpack(f.read(headerFormat.size))
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a world file")
+    cells = np.memmap(path, dtype=np.uint8, mode="r", offset=headerSize, shape=(count,))
+    trailsStart = headerSize + padded(count)
+    trails = np.memmap(path, dtype="<i2", mode="r", offset=trailsStart, shape=(count,))
+    rngState = None
+    if stateLen > 0:
+        state = np.memmap(path, dtype="<u4", mode="r", offset=trailsStart + padded(count * 2), shape=(stateLen,))
+        rngState = (3, tuple(int(v) for v in state), None)
+    return (xR, yR, zR), cells, trails, rngState
+
+
+# Save a grid as a world file
+def saveGrid(path: str, grid: HexGrid):
+    saveWorldFile(path, grid.xR, grid.yR, grid.zR, grid.flatCells(), grid.flatTrails())
+
+
+# Load a world file into a new grid
+def loadGrid(path: str) -> HexGrid:
+    (xR, yR, zR), cells, trails, _ = loadWorldFile(path)
+    grid = HexGrid(xR, yR, zR)
+    grid.loadFlat(cells.tobytes().decode("ascii"), trails.tolist())
+    return grid
+
+
+# Content addressed cache of generated random maps
+class WorldCache(object):
+    root: str # Directory holding the world files
+    hits: int = 0
+    misses: int = 0
+
+    # Initialize
+    def __init__(self, root: str = os.path.join("results", "world_cache")):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    # File name for a map, from everything that decides what it looks like
+    def key(self, seed: int, dims: tuple) -> str:
+        return hashlib.sha1(repr((seed, tuple(dims))).encode()).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key + ".hgw")
+
+    # Fill in the world's dimensions and map memory from the cache, False if it's not there
+    def load(self, key: str, world: "HexGridWorld") -> bool:
+        path = self.path(key)
+        if not os.path.exists(path):
+            self.misses += 1
+            return False
+        (world.xR, world.yR, world.zR), cells, _, rngState = loadWorldFile(path)
+        world.gridMemory = list(cells.tobytes().decode("ascii"))
+        # Leave the world's random source where generating the map would have left it
+        if rngState is not None and isinstance(world.rng, random.Random):
+            world.rng.setstate(rngState)
+        self.hits += 1
+        return True
+
+    # Store the map a world just generated, before anything else draws from its random source
+    def store(self, key: str, world: "HexGridWorld"):
+        rngState = world.rng.getstate() if isinstance(world.rng, random.Random) else None
+        saveWorldFile(self.path(key), world.xR, world.yR, world.zR, world.gridMemory, rngState = rngState)
@@ -7,8 +7,11 @@ Also includes some helpers.
 
 # Imports
 from hex_grid import HexGrid
+from chunked_grid import ChunkedHexGrid
 import ants
-from random import randint
+from functools import lru_cache
+import random
+import numpy as np
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -19,12 +22,14 @@ if TYPE_CHECKING:
 def createQueen(world: "HexGridWorld", c: tuple[int, int, int]):
     world.colony.append(ants.Queen(world.grid, x = c[0], y = c[1], z = c[2]))
     world.colony[0].colony = world.colony
+    world.colony[0].rng = world.rng
     world.grid.setCell(c, "Q")
     
 # Helper for placing a worker
 def createWorker(world: "HexGridWorld", c: tuple[int, int, int], dir: int = 0):
     world.colony.append(ants.Worker(world.grid, x = c[0], y = c[1], z = c[2], dir = dir))
     world.colony[-1].queen = world.colony[0]
+    world.colony[-1].rng = world.rng
     world.grid.setCell(c, "W")
 
 # Helper for filling hexagonal clusters of cells with a tile type
@@ -52,11 +57,11 @@ def randomWorld(world: "HexGridWorld"):
     if world.gridMemory == None:
         # New random map, first episode
         if world.xR == None:
-            world.xR = randint(10, 100)
+            world.xR = world.rng.randint(10, 100)
         if world.yR == None:
-            world.yR = randint(10, 100)
+            world.yR = world.rng.randint(10, 100)
         if world.zR == None:
-            world.zR = randint(10, 100)
+            world.zR = world.rng.randint(10, 100)
         # Create grid
         world.grid = HexGrid(world.xR, world.yR, world.zR)
         # Random world generation
@@ -64,31 +69,31 @@ def randomWorld(world: "HexGridWorld"):
         # Three nested loops, each covering the sector with the two used axes plus one of those axes
         for i in range(world.xR):
             for ii in range(1, world.yR):
-                gen = randint(0,29) # Randomly determine what object to place
+                gen = world.rng.randint(0,29) # Randomly determine what object to place
                 if gen == 0: # Food
                     world.grid.setCell((i,ii,0), "F")
                 if gen == 1: # Obstacle
                     world.grid.setCell((i,ii,0), "O")
                 if gen == 2: # Obstacle but larger cluster
-                    buildCluster(world, (i,ii,0), randint(1, maxRockSize), "O")
+                    buildCluster(world, (i,ii,0), world.rng.randint(1, maxRockSize), "O")
         for i in range(world.yR):
             for ii in range(1, world.zR):
-                gen = randint(0,29)
+                gen = world.rng.randint(0,29)
                 if gen == 0:
                     world.grid.setCell((0,i,ii), "F")
                 if gen == 1:
                     world.grid.setCell((0,i,ii), "O")
                 if gen == 2:
-                    buildCluster(world, (0,i,ii), randint(1, maxRockSize), "O")
+                    buildCluster(world, (0,i,ii), world.rng.randint(1, maxRockSize), "O")
         for i in range(world.zR):
             for ii in range(1, world.xR):
-                gen = randint(0,29)
+                gen = world.rng.randint(0,29)
                 if gen == 0:
                     world.grid.setCell((ii,0,i), "F")
                 if gen == 1:
                     world.grid.setCell((ii,0,i), "O")
                 if gen == 2:
-                    buildCluster(world, (ii,0,i), randint(1, maxRockSize), "O")
+                    buildCluster(world, (ii,0,i), world.rng.randint(1, maxRockSize), "O")
         # Large food clusters
         # Three, one close to the end of each axis, size also dependent on that axis
         pileX = int(world.xR * 0.75)
@@ -105,40 +110,165 @@ def randomWorld(world: "HexGridWorld"):
         space = 3 # Number of free cells around the queen on each axis
         buildCluster(world, (0,0,0), space + 1, "E")
         # Store map
-        world.gridMemory = ["Q"]
-        for i in range(world.xR):
-            for ii in range(1, world.yR):
-                world.gridMemory.append(world.grid.getCell((i,ii,0)))
-        for i in range(world.yR):
-            for ii in range(1, world.zR):
-                world.gridMemory.append(world.grid.getCell((0,i,ii)))
-        for i in range(world.zR):
-            for ii in range(1, world.xR):
-                world.gridMemory.append(world.grid.getCell((ii,0,i)))
+        world.gridMemory = world.grid.flatCells()
+        world.gridMemory[0] = "Q"
+        if world.cacheKey is not None:
+            world.worldCache.store(world.cacheKey, world)
     # Subsequent episodes
     else:
         # Load previously saved map
         world.grid = HexGrid(world.xR, world.yR, world.zR)
-        world.grid.setCell((0,0,0), world.gridMemory[0])
-        iterateCell = 1
-        for i in range(world.xR):
-            for ii in range(1, world.yR):
-                world.grid.setCell((i,ii,0), world.gridMemory[iterateCell])
-                iterateCell += 1
-        for i in range(world.yR):
-            for ii in range(1, world.zR):
-                world.grid.setCell((0,i,ii), world.gridMemory[iterateCell])
-                iterateCell += 1
-        for i in range(world.zR):
-            for ii in range(1, world.xR):
-                world.grid.setCell((ii,0,i), world.gridMemory[iterateCell])
-                iterateCell += 1
+        world.grid.loadFlat(world.gridMemory)
+    # Create queen
+    # Always at 0,0,0 in random world
+    createQueen(world, (0,0,0))
+    world.colony[0].food = 1 # One worker to start
+    world.colony[0].act() # Spawn that worker at random adjacent location
+
+# Flat indices (HexGrid.flatCoords order) of an (n, 3) array of coords, normalizing them first
+# Coords off the grid come back as -1
+def flatIndexArray(c: np.ndarray, xR: int, yR: int, zR: int) -> np.ndarray:
+    c = c - c.min(axis=1, keepdims=True)
+    x, y, z = c[:, 0], c[:, 1], c[:, 2]
+    startYZ = 1 + xR * (yR - 1)
+    startZX = startYZ + yR * (zR - 1)
+    index = np.zeros(len(c), dtype=np.int64)
+    faceXY = (z == 0) & (y > 0)
+    faceYZ = (x == 0) & (z > 0)
+    faceZX = (y == 0) & (x > 0)
+    index[faceXY] = 1 + x[faceXY] * (yR - 1) + y[faceXY] - 1
+    index[faceYZ] = startYZ + y[faceYZ] * (zR - 1) + z[faceYZ] - 1
+    index[faceZX] = startZX + z[faceZX] * (xR - 1) + x[faceZX] - 1
+    index[(x >= xR) | (y >= yR) | (z >= zR)] = -1
+    return index
+
+# All cell coords of a grid size in flat order, as an (n, 3) array
+@lru_cache(maxsize=64)
+def flatCoordArray(xR: int, yR: int, zR: int) -> np.ndarray:
+    coords = np.array(HexGrid(xR, yR, zR).flatCoords(), dtype=np.int64)
+    coords.flags.writeable = False
+    return coords
+
+# Offsets covered by buildCluster at a given scale, centre first
+@lru_cache(maxsize=None)
+def clusterOffsets(scale: int) -> np.ndarray:
+    offsets = [(0,0,0)]
+    for i in range(scale):
+        for ii in range(1, scale):
+            offsets += [(i,ii,0), (0,i,ii), (ii,0,i)]
+    return np.array(offsets, dtype=np.int64)
+
+# NumPy take on the random world layout, returns cell codes (bytes) in flat order
+# Same rules and the same draws as randomWorld: 1 in 30 cells each get food, a rock, or a rock cluster,
+# then three big food piles, then the space around the queen is cleared
+# randomWorld's sweep is flat order, so drawing from the same random source cell by cell gives the same map and leaves the source
+# in the same state, only the draws are made in Python, the clusters are stamped from offset masks
+def randomLayout(xR: int, yR: int, zR: int, rng: random.Random) -> np.ndarray:
+    count = 1 + xR * (yR - 1) + yR * (zR - 1) + zR * (xR - 1)
+    maxRockSize = int(min(xR, yR, zR) * 0.1)
+    coords = flatCoordArray(xR, yR, zR)
+
+    # The sweep skips the queen's cell, a cluster's size is drawn right after its cell's draw
+    randint = rng.randint
+    gen = [-1]
+    scales = []
+    for _ in range(1, count):
+        g = randint(0, 29)
+        gen.append(g)
+        if g == 2:
+            scales.append(randint(1, maxRockSize))
+    gen = np.array(gen, dtype=np.int64)
+    scales = np.array(scales, dtype=np.int64)
+
+    # Every write is a (target cell, order, value), later orders win like the sequential version
+    # Single cells are written by index, clusters are stamped as coords and indexed all at once
+    targets, orders, values = [], [], []
+    stampCoords, stampOrders, stampValues = [], [], []
+    for code, value in ((0, "F"), (1, "O")):
+        cells = np.nonzero(gen == code)[0]
+        targets.append(cells)
+        orders.append(cells)
+        values.append(np.full(len(cells), ord(value), dtype=np.uint8))
+    centres = np.nonzero(gen == 2)[0]
+    for scale in np.unique(scales):
+        group = centres[scales == scale]
+        offsets = clusterOffsets(int(scale))
+        stampCoords.append((coords[group][:, None, :] + offsets[None, :, :]).reshape(-1, 3))
+        stampOrders.append(np.repeat(group, len(offsets)))
+        stampValues.append(np.full(len(group) * len(offsets), ord("O"), dtype=np.uint8))
+
+    # Large food clusters, then the clearing, after everything else
+    piles = ((int(xR * 0.75),0,0,int((xR - int(xR * 0.75)) * 0.5), "F"),
+             (0,int(yR * 0.75),0,int((yR - int(yR * 0.75)) * 0.5), "F"),
+             (0,0,int(zR * 0.75),int((zR - int(zR * 0.75)) * 0.5), "F"),
+             (0,0,0,4, "E"))
+    for i, (x, y, z, scale, value) in enumerate(piles):
+        offsets = clusterOffsets(scale)
+        stampCoords.append(np.array((x, y, z), dtype=np.int64) + offsets)
+        stampOrders.append(np.full(len(offsets), count + i))
+        stampValues.append(np.full(len(offsets), ord(value), dtype=np.uint8))
+    targets.append(flatIndexArray(np.concatenate(stampCoords), xR, yR, zR))
+    orders.append(np.concatenate(stampOrders))
+    values.append(np.concatenate(stampValues))
+
+    # Keep the last write to every cell
+    targets = np.concatenate(targets)
+    orders = np.concatenate(orders)
+    values = np.concatenate(values)
+    keep = targets >= 0
+    order = np.argsort(orders[keep], kind="stable")[::-1]
+    targets = targets[keep][order]
+    values = values[keep][order]
+    cells, first = np.unique(targets, return_index=True)
+    layout = np.full(count, ord("E"), dtype=np.uint8)
+    layout[cells] = values[first]
+    layout[0] = ord("Q")
+    return layout
+
+# World 0, NumPy generator
+# Same map as randomWorld for the same random source, made in bulk
+def randomWorldFast(world: "HexGridWorld"):
+    # First episode
+    if world.gridMemory == None:
+        if world.xR == None:
+            world.xR = world.rng.randint(10, 100)
+        if world.yR == None:
+            world.yR = world.rng.randint(10, 100)
+        if world.zR == None:
+            world.zR = world.rng.randint(10, 100)
+        world.gridMemory = list(randomLayout(world.xR, world.yR, world.zR, world.rng).tobytes().decode("ascii"))
+        if world.cacheKey is not None:
+            world.worldCache.store(world.cacheKey, world)
+    # Load the map
+    world.grid = HexGrid(world.xR, world.yR, world.zR)
+    world.grid.loadFlat(world.gridMemory)
+    # Create queen
+    # Always at 0,0,0 in random world
+    createQueen(world, (0,0,0))
+    world.colony[0].food = 1 # One worker to start
+    world.colony[0].act() # Spawn that worker at random adjacent location
+
+
+# World 2 (huge random)
+# Generated a chunk at a time as the ants reach it, 10000 per axis unless given
+# The map seed is kept so every episode gets the same map
+def chunkedWorld(world: "HexGridWorld"):
+    if world.mapSeed is None:
+        world.mapSeed = world.worldSeed if world.worldSeed is not None else world.rng.getrandbits(64)
+    if world.xR == None:
+        world.xR = 10000
+    if world.yR == None:
+        world.yR = 10000
+    if world.zR == None:
+        world.zR = 10000
+    world.grid = ChunkedHexGrid(world.xR, world.yR, world.zR, world.mapSeed)
     # Create queen
     # Always at 0,0,0 in random world
     createQueen(world, (0,0,0))
     world.colony[0].food = 1 # One worker to start
     world.colony[0].act() # Spawn that worker at random adjacent location
 
+
 # World 1
 # Small, queen at bottom, one food at top, pre-drawn trail straight between them
 def presetWorld1(world: "HexGridWorld"):
@@ -11,17 +11,20 @@ Available tests:
 - compare_q_dyna_sarsa(): Q-learning vs Dyna-Q vs SARSA; overwrites unless timestamped.
 - sarsa_smoothed_plot(): single SARSA run with ε-decay and a rolling-mean plot.
 - hyperparameter_sweep(): Q-learning vs Dyna-Q (planning 3/5) over a small lr/gamma/eps/decay grid; saves CSV and plots.
+- import_budget_smoke_test(): headless imports stay free of pygame/matplotlib/gymnasium and under a time budget.
+- random_world_smoke_test(): the NumPy random map generator makes the same map as the original for every seed.
 
 Results paths:
 - Comparisons (Q vs Dyna): results/comparisons/ (timestamped if you pass timestamped=True).
 - Comparisons (with SARSA): results/comparisons_with_sarsa/ (timestamped optional).
 - SARSA smoothed plot: defaults to training_results_sarsa_smoothed.png (set output_path to override).
 - Hyperparameter sweeps: results/hyperparameter_sweeps/ (timestamped optional).
+- Speed benchmarks: results/benchmarks/, run python benchmark.py (--save-baseline to store a baseline to compare against).
 """
 
 from testbed import compare_q_vs_dyna, compare_q_vs_dyna_suite
 from testbed_hyperparameters import main as hyperparameter_sweep
-from testbed import train_agent
+from testbed import train_agent, import_budget_smoke_test, random_world_smoke_test
 from sarsa import SARSAAgent
 
 
@@ -144,6 +147,8 @@ def main():
     # compare_q_vs_dyna_grid()
     # hyperparameter_sweep_run()
     # sarsa_smoothed_plot()
+    # import_budget_smoke_test()
+    # random_world_smoke_test()
 
     print("No tests selected. Edit test_runner.py main() to uncomment a test.")
 
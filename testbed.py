@@ -14,6 +14,7 @@ import random
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
 import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 os.environ.setdefault("MPLCONFIGDIR", os.path.join(tempfile.gettempdir(), "matplotlib"))
 os.environ.setdefault("XDG_CACHE_HOME", os.path.join(tempfile.gettempdir(), "matplotlib_cache"))
 
@@ -21,6 +22,16 @@ from hex_grid_world import HexGridWorld
 from q_learning import QLearningAgent
 from dyna_q import DynaQAgent
 from sarsa import SARSAAgent
+from event_log import EventLog, INFO
+from engine import Engine, ProgressLog
+from profiling import ProfileEpisodes
+from result_store import ResultStore
+from eval_service import EvalService
+from dp_solver import DPSolver
+from env_pool import EnvPool
+from pool_trainer import PoolTrainer
+from world_cache import WorldCache
+from confidence import stack_runs, rolling_mean, bootstrap_ci
 
 
 def train_agent(
@@ -37,8 +48,18 @@ def train_agent(
     collect_deliveries: bool = False,
     return_agent: bool = False,
     seed: Optional[int] = None,
+    log: Optional[EventLog] = None,
+    callbacks: Optional[list] = None,
+    profile: bool = False,
+    warm_start: bool = False,
+    maps: Optional[int] = None,
+    map_seed: int = 0,
+    envs: int = 8,
+    workers: Optional[int] = None,
 ) -> Tuple[List[int], List[int]]:
     agent_kwargs = agent_kwargs or {}
+    if log is None:
+        log = EventLog(level=INFO, echo=True)
     filtered_agent_kwargs = dict(agent_kwargs)
     filtered_agent_kwargs.pop("epsilon_decay", None)
     filtered_agent_kwargs.pop("min_epsilon", None)
@@ -47,7 +68,15 @@ def train_agent(
         random.seed(seed)
         np.random.seed(seed)
 
-    world = HexGridWorld(train=True, worldType=1, animate=animate)
+    # With maps, train on that many seeded random maps spread over a pool of worlds instead of the preset map
+    if maps is not None:
+        # The pool's worlds live in its worker processes, these options all need one in this process
+        unsupported = [name for name, value in (("animate", animate), ("profile", profile), ("warm_start", warm_start)) if value]
+        if unsupported:
+            raise ValueError(f"{', '.join(unsupported)} can't be used with maps, the pool's worlds run in other processes")
+        world = None
+    else:
+        world = HexGridWorld(train=True, worldType=1, animate=animate, log=log)
 
     # Instantiate the requested agent type once and reuse across episodes
     q_agent = agent_cls(
@@ -56,54 +85,46 @@ def train_agent(
         epsilon=epsilon,
         epsilon_decay=agent_kwargs.get("epsilon_decay", epsilon_decay),
         min_epsilon=agent_kwargs.get("min_epsilon", min_epsilon),
+        seed=seed,
         **filtered_agent_kwargs,
     )
-    if len(world.colony) > 1:
-        world.colony[1].q_agent = q_agent
-
-    episode_rewards = []
-    episode_lengths = []
-    episode_deliveries = []
-
-    print(f"Training with fixed hyperparameters: lr={learning_rate}, γ={discount_factor}, ε={epsilon}")
-
-    for episode in range(episodes):
-        world.reset()
-        start_food = getattr(world.colony[0], "food", 0) if len(world.colony) > 0 else 0
-
-        # Reattach the persistent agent after reset (new worker object each reset)
-        if len(world.colony) > 1:
-            world.colony[1].q_agent = q_agent
-
-        total_reward = 0
-        steps = 0
-        terminated = False
-        truncated = False
-
-        while not (terminated or truncated) and steps < max_steps:
-            _, reward, terminated, truncated, _ = world.step(None)
-
-            if reward is not None:
-                total_reward += reward
-            steps += 1
-
-        end_food = getattr(world.colony[0], "food", 0) if len(world.colony) > 0 else 0
-        deliveries = max(0, end_food - start_food)
-
-        episode_rewards.append(total_reward)
-        episode_lengths.append(steps)
-        if collect_deliveries:
-            episode_deliveries.append(deliveries)
-
-        # Decay epsilon each episode for agents that support it
-        if hasattr(q_agent, "decay_epsilon"):
-            q_agent.decay_epsilon()
+    # Start from the exact solution of the world instead of an empty table
+    if warm_start:
+        DPSolver(world, discount_factor, q_agent.n_actions).solve().warmStart(q_agent)
+
+    log.emit(
+        INFO,
+        "train_start",
+        msg=f"Training with fixed hyperparameters: lr={learning_rate}, γ={discount_factor}, ε={epsilon}",
+        agent=agent_cls.__name__,
+        lr=learning_rate,
+        gamma=discount_factor,
+        epsilon=epsilon,
+    )
 
-        if episode % 100 == 0:
-            avg_reward = sum(episode_rewards[-100:]) / min(100, len(episode_rewards))
-            avg_length = sum(episode_lengths[-100:]) / min(100, len(episode_lengths))
-            current_eps = getattr(q_agent, "epsilon", epsilon)
-            print(f"Episode {episode}: Avg Reward = {avg_reward:.2f}, Avg Length = {avg_length:.2f}, ε={current_eps:.3f}")
+    progress = ProgressLog(log, epsilon=epsilon, epsilonFormat="ε={:.3f}")
+    callbacks = [progress] + list(callbacks or [])
+    # Per-phase step timing, summarized in the log at the end
+    if profile:
+        callbacks.append(ProfileEpisodes(log=log))
+    if maps is not None:
+        with EnvPool(
+            envs,
+            numWorkers=workers,
+            worldType=0,
+            train=True,
+            maxSteps=max_steps,
+            seed=seed,
+            maps=list(range(map_seed, map_seed + maps)),
+            generator="numpy",
+            worldCache=WorldCache(),
+        ) as pool:
+            engine = PoolTrainer(pool, q_agent, callbacks=callbacks).run(episodes)
+    else:
+        engine = Engine(world, q_agent, maxSteps=max_steps, callbacks=callbacks).run(episodes)
+    episode_rewards = engine.rewards
+    episode_lengths = engine.lengths
+    episode_deliveries = engine.deliveries
 
     if collect_deliveries and return_agent:
         return episode_rewards, episode_lengths, episode_deliveries, q_agent
@@ -150,6 +171,49 @@ def dyna_q_smoke_test() -> None:
     print("Dyna-Q smoke test passed.")
 
 
+def random_world_smoke_test(seeds: int = 20) -> None:
+    """
+    Check that the NumPy random map generator makes the same map as the original for the same seed,
+    and leaves the world's random source in the same state, so episodes on either map play out the same.
+    """
+    for seed in range(seeds):
+        original = HexGridWorld(train=True, worldType=0, seed=seed)
+        fast = HexGridWorld(train=True, worldType=0, seed=seed, generator="numpy")
+        dims = (original.xR, original.yR, original.zR)
+        assert (fast.xR, fast.yR, fast.zR) == dims, f"Seed {seed}: dimensions {(fast.xR, fast.yR, fast.zR)} != {dims}"
+        assert fast.grid.flatCells() == original.grid.flatCells(), f"Seed {seed}: maps differ"
+        assert fast.rng.getstate() == original.rng.getstate(), f"Seed {seed}: random sources differ after generation"
+
+    print("Random world smoke test passed.")
+
+
+def import_budget_smoke_test(budget_s: float = 1.0) -> None:
+    """
+    Check that headless startup stays light, so short-lived sweep and pool workers start fast.
+    Imports the world, the engine, the pool and the sweep in a fresh interpreter, which must not load
+    pygame, matplotlib or gymnasium and must take under budget_s seconds.
+    """
+    import json
+    import subprocess
+    root = os.path.dirname(os.path.abspath(__file__))
+    code = (
+        "import sys, time, json\n"
+        f"sys.path[:0] = [{os.path.join(root, 'src')!r}, {root!r}]\n"
+        "start = time.perf_counter()\n"
+        "import hex_grid_world, engine, env_pool, testbed_hyperparameters\n"
+        "elapsed = time.perf_counter() - start\n"
+        "heavy = [m for m in ('pygame', 'matplotlib', 'gymnasium') if m in sys.modules]\n"
+        "print(json.dumps({'elapsed': elapsed, 'heavy': heavy}))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    result = json.loads(out.strip().splitlines()[-1])
+
+    assert not result["heavy"], f"Headless imports loaded {', '.join(result['heavy'])}"
+    assert result["elapsed"] < budget_s, f"Headless imports took {result['elapsed']:.3f}s, budget is {budget_s:.3f}s"
+
+    print(f"Import budget smoke test passed ({result['elapsed'] * 1000:.0f} ms).")
+
+
 def plot_training_results(episode_rewards: List[int], episode_lengths: List[int]) -> None:
     import matplotlib
     matplotlib.use("Agg")
@@ -173,6 +237,104 @@ def plot_training_results(episode_rewards: List[int], episode_lengths: List[int]
     plt.show()
 
 
+def greedy_eval(
+    q_table: dict,
+    max_steps: int,
+    eval_episodes: int = 50,
+    seed: Optional[int] = None,
+    workers: int = 1,
+    n_actions: int = 5,
+    interner=None,
+) -> Tuple[List[int], List[int], List[int]]:
+    """
+    Run the frozen greedy policy of a trained Q-table in the full environment (train=False).
+    Deterministic results are cached in results/eval_cache by policy fingerprint, stochastic ones use up to `workers` processes.
+    Returns per-episode rewards, lengths and deliveries.
+    """
+    with EvalService(workers=workers, store=ResultStore(os.path.join("results", "eval_cache"))) as service:
+        return service.evaluate(q_table, worldType=1, maxSteps=max_steps, episodes=eval_episodes, seed=seed, nActions=n_actions, interner=interner)
+
+
+def optimal_baseline(max_steps: int = 1000, discount_factor: float = 0.9) -> Tuple[float, float, float]:
+    """
+    Expected reward, steps and deliveries per training episode of the optimal policy, solved exactly with dynamic programming.
+    The ceiling for regret: no agent learning on observations can do better on average.
+    """
+    world = HexGridWorld(train=True, worldType=1, animate=False)
+    return DPSolver(world, discount_factor).solve().expectedReturn(max_steps)
+
+
+def train_and_eval(
+    agent_cls,
+    agent_kwargs: dict,
+    episodes: int,
+    epsilon: float,
+    epsilon_decay: float,
+    min_epsilon: float,
+    max_steps: int,
+    seed: Optional[int],
+    store: Optional[ResultStore] = None,
+    log: Optional[EventLog] = None,
+    eval_workers: int = 1,
+) -> dict:
+    """
+    Train one agent, then evaluate it greedily, for the comparisons.
+    Returns {"summary": eval means, "series": per-episode training lists}.
+    With a store, finished runs are read back instead of rerun, and new ones are saved as soon as they finish.
+    """
+    # Reuse the same lr/gamma from train_agent defaults
+    learning_rate = 0.1
+    discount_factor = 0.9
+    eval_episodes = 50
+    config = {
+        "run": "comparison",
+        "agent": agent_cls.__name__,
+        "agent_kwargs": agent_kwargs,
+        "episodes": episodes,
+        "learning_rate": learning_rate,
+        "discount_factor": discount_factor,
+        "epsilon": epsilon,
+        "epsilon_decay": epsilon_decay,
+        "min_epsilon": min_epsilon,
+        "max_steps": max_steps,
+        "eval_episodes": eval_episodes,
+        "eval": "frozen_greedy",
+        "seed": seed,
+    }
+    if store is not None:
+        entry = store.get(config)
+        if entry is not None:
+            print(f"Using stored {agent_cls.__name__} run {store.key(config)[:10]}")
+            return entry
+
+    rewards, lengths, deliveries, agent = train_agent(
+        animate=False,
+        agent_cls=agent_cls,
+        agent_kwargs=agent_kwargs,
+        episodes=episodes,
+        learning_rate=learning_rate,
+        discount_factor=discount_factor,
+        epsilon=epsilon,
+        epsilon_decay=epsilon_decay,
+        min_epsilon=min_epsilon,
+        max_steps=max_steps,
+        collect_deliveries=True,
+        return_agent=True,
+        seed=seed,
+        log=log,
+    )
+    eval_rewards, eval_lengths, eval_deliveries = greedy_eval(agent.q_table, max_steps, eval_episodes, seed, eval_workers, agent.n_actions, agent.interner)
+    summary = {
+        "eval_avg_reward": float(np.mean(eval_rewards)),
+        "eval_avg_steps": float(np.mean(eval_lengths)),
+        "eval_avg_deliveries": float(np.mean(eval_deliveries)),
+    }
+    series = {"rewards": rewards, "lengths": lengths, "deliveries": deliveries}
+    if store is not None:
+        store.put(config, summary, series)
+    return {"config": config, "summary": summary, "series": series}
+
+
 def compare_q_vs_dyna(
     planning_steps: int = 20,
     epsilon: float = 0.3,
@@ -185,99 +347,89 @@ def compare_q_vs_dyna(
     output_path: Optional[str] = None,
     timestamped: bool = False,
     include_sarsa: bool = True,
-) -> None:
+    store: Optional[ResultStore] = None,
+    n_seeds: int = 5,
+    workers: Optional[int] = None,
+) -> dict:
     """
     Train Q-learning, Dyna-Q (with the same hyperparameters) and optionally SARSA, then plot a side-by-side comparison.
-    Adds rolling mean smoothing and logs deliveries/eval summaries.
+    Every algorithm is run with n_seeds seeds (seed, seed + 1, ...) over a process pool.
+    Plots the mean over seeds with rolling mean smoothing and shaded 95% bootstrap confidence bands,
+    and logs deliveries/eval summaries.
+    Returns each algorithm's per-seed runs, keyed "q_learning", "dyna_q" and "sarsa".
     """
-    # Common hyperparams and seed for reproducibility
-    q_rewards, q_lengths, q_deliveries, q_agent = train_agent(
-        animate=False,
-        agent_cls=QLearningAgent,
-        episodes=episodes,
-        epsilon=epsilon,
-        epsilon_decay=epsilon_decay,
-        min_epsilon=min_epsilon,
-        max_steps=max_steps,
-        collect_deliveries=True,
-        return_agent=True,
-        seed=seed,
-    )
-
-    dyna_rewards, dyna_lengths, dyna_deliveries, dyna_agent = train_agent(
-        animate=False,
-        agent_cls=DynaQAgent,
-        agent_kwargs={"planning_steps": planning_steps},
+    # Common hyperparams, one run per algorithm and seed
+    algos = [
+        ("q_learning", "Q-learning", QLearningAgent, {}),
+        ("dyna_q", f"Dyna-Q {planning_steps}", DynaQAgent, {"planning_steps": planning_steps}),
+    ]
+    if include_sarsa:
+        algos.append(("sarsa", "SARSA", SARSAAgent, {}))
+    seeds = [None if seed is None else seed + k for k in range(n_seeds)]
+    common = dict(
         episodes=episodes,
         epsilon=epsilon,
         epsilon_decay=epsilon_decay,
         min_epsilon=min_epsilon,
         max_steps=max_steps,
-        collect_deliveries=True,
-        return_agent=True,
-        seed=seed,
+        store=store,
     )
-
-    sarsa_rewards = sarsa_lengths = sarsa_deliveries = sarsa_agent = None
-    if include_sarsa:
-        sarsa_rewards, sarsa_lengths, sarsa_deliveries, sarsa_agent = train_agent(
-            animate=False,
-            agent_cls=SARSAAgent,
-            episodes=episodes,
-            epsilon=epsilon,
-            epsilon_decay=epsilon_decay,
-            min_epsilon=min_epsilon,
-            max_steps=max_steps,
-            collect_deliveries=True,
-            return_agent=True,
-            seed=seed,
-        )
+    jobs = [(name, k, agent_cls, agent_kwargs) for name, _, agent_cls, agent_kwargs in algos for k in range(n_seeds)]
+    if workers is None:
+        workers = os.cpu_count() or 1
+    runs = {name: [None] * n_seeds for name, _, _, _ in algos}
+    if workers == 1 or len(jobs) == 1:
+        for name, k, agent_cls, agent_kwargs in jobs:
+            runs[name][k] = train_and_eval(agent_cls, agent_kwargs, seed=seeds[k], **common)
+    else:
+        # Workers stay quiet, their runs come back whole
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            futures = {
+                pool.submit(train_and_eval, agent_cls, agent_kwargs, seed=seeds[k], log=EventLog(), **common): (name, k)
+                for name, k, agent_cls, agent_kwargs in jobs
+            }
+            for future in as_completed(futures):
+                name, k = futures[future]
+                runs[name][k] = future.result()
+
+    optimal_reward, optimal_steps, _ = optimal_baseline(max_steps)
+
+    # (seeds, episodes) arrays per algorithm and metric
+    series = {
+        name: {metric: stack_runs([run["series"][metric] for run in runs[name]]) for metric in ("rewards", "lengths", "deliveries")}
+        for name in runs
+    }
 
     import matplotlib
     matplotlib.use("Agg")
     import matplotlib.pyplot as plt
     fig, axes = plt.subplots(3, 1, figsize=(10, 12))
 
-    def rolling_mean(data):
-        if len(data) < smooth_window:
-            return []
-        weights = np.ones(smooth_window) / smooth_window
-        return np.convolve(data, weights, mode="valid")
-
-    # Rewards with smoothing
-    axes[0].plot(q_rewards, alpha=0.3, label="Q-learning (raw)")
-    axes[0].plot(dyna_rewards, alpha=0.3, label=f"Dyna-Q {planning_steps} (raw)")
-    if sarsa_rewards:
-        axes[0].plot(sarsa_rewards, alpha=0.3, label="SARSA (raw)")
-    q_smooth = rolling_mean(q_rewards)
-    d_smooth = rolling_mean(dyna_rewards)
-    s_smooth = rolling_mean(sarsa_rewards) if sarsa_rewards else []
-    if len(q_smooth) > 0:
-        axes[0].plot(range(smooth_window - 1, smooth_window - 1 + len(q_smooth)), q_smooth, label="Q-learning (smooth)")
-    if len(d_smooth) > 0:
-        axes[0].plot(range(smooth_window - 1, smooth_window - 1 + len(d_smooth)), d_smooth, label=f"Dyna-Q {planning_steps} (smooth)")
-    if len(s_smooth) > 0:
-        axes[0].plot(range(smooth_window - 1, smooth_window - 1 + len(s_smooth)), s_smooth, label="SARSA (smooth)")
-    axes[0].set_title('Training Rewards Comparison')
+    # Mean over seeds raw, then smoothed with its confidence band
+    def plot_metric(ax, metric):
+        for name, label, _, _ in algos:
+            data = series[name][metric]
+            ax.plot(data.mean(axis=0), alpha=0.3, label=f"{label} (raw)")
+            smooth = rolling_mean(data, smooth_window)
+            if smooth.shape[1] > 0:
+                mean, low, high = bootstrap_ci(smooth, seed=0)
+                x = range(smooth_window - 1, smooth_window - 1 + smooth.shape[1])
+                line, = ax.plot(x, mean, label=f"{label} (smooth)")
+                if n_seeds > 1:
+                    ax.fill_between(x, low, high, color=line.get_color(), alpha=0.2)
+
+    # Rewards with smoothing, the exact optimum for reference
+    plot_metric(axes[0], "rewards")
+    axes[0].axhline(optimal_reward, color="black", linestyle="--", linewidth=1, label="Optimal (DP)")
+    axes[0].set_title('Training Rewards Comparison' + (f' (mean of {n_seeds} seeds, 95% CI)' if n_seeds > 1 else ''))
     axes[0].set_xlabel('Episode')
     axes[0].set_ylabel('Total Reward')
     axes[0].grid(True)
     axes[0].legend()
 
     # Lengths with smoothing
-    axes[1].plot(q_lengths, alpha=0.3, label="Q-learning (raw)")
-    axes[1].plot(dyna_lengths, alpha=0.3, label=f"Dyna-Q {planning_steps} (raw)")
-    if sarsa_lengths:
-        axes[1].plot(sarsa_lengths, alpha=0.3, label="SARSA (raw)")
-    ql_smooth = rolling_mean(q_lengths)
-    dl_smooth = rolling_mean(dyna_lengths)
-    sl_smooth = rolling_mean(sarsa_lengths) if sarsa_lengths else []
-    if len(ql_smooth) > 0:
-        axes[1].plot(range(smooth_window - 1, smooth_window - 1 + len(ql_smooth)), ql_smooth, label="Q-learning (smooth)")
-    if len(dl_smooth) > 0:
-        axes[1].plot(range(smooth_window - 1, smooth_window - 1 + len(dl_smooth)), dl_smooth, label=f"Dyna-Q {planning_steps} (smooth)")
-    if len(sl_smooth) > 0:
-        axes[1].plot(range(smooth_window - 1, smooth_window - 1 + len(sl_smooth)), sl_smooth, label="SARSA (smooth)")
+    plot_metric(axes[1], "lengths")
+    axes[1].axhline(optimal_steps, color="black", linestyle="--", linewidth=1, label="Optimal (DP)")
     axes[1].set_title('Episode Lengths Comparison')
     axes[1].set_xlabel('Episode')
     axes[1].set_ylabel('Steps')
@@ -285,10 +437,11 @@ def compare_q_vs_dyna(
     axes[1].legend()
 
     # Deliveries
-    axes[2].plot(q_deliveries, alpha=0.3, label="Q-learning deliveries")
-    axes[2].plot(dyna_deliveries, alpha=0.3, label=f"Dyna-Q {planning_steps} deliveries")
-    if sarsa_deliveries:
-        axes[2].plot(sarsa_deliveries, alpha=0.3, label="SARSA deliveries")
+    for name, label, _, _ in algos:
+        mean, low, high = bootstrap_ci(series[name]["deliveries"], seed=0)
+        line, = axes[2].plot(mean, alpha=0.3, label=f"{label} deliveries")
+        if n_seeds > 1:
+            axes[2].fill_between(range(len(mean)), low, high, color=line.get_color(), alpha=0.15)
     axes[2].set_title('Food Deliveries per Episode')
     axes[2].set_xlabel('Episode')
     axes[2].set_ylabel('Deliveries')
@@ -308,56 +461,20 @@ def compare_q_vs_dyna(
 
     plt.tight_layout()
     plt.savefig(output_path)
-
-    # Greedy eval summary
-    def greedy_eval(agent_cls, q_table):
-        eval_agent = agent_cls(
-            learning_rate=learning_rate,
-            discount_factor=discount_factor,
-            epsilon=0.0,
-            epsilon_decay=1.0,
-            min_epsilon=0.0,
-            **({"planning_steps": planning_steps} if agent_cls is DynaQAgent else {}),
-        )
-        eval_agent.q_table = dict(q_table)
-        eval_world = HexGridWorld(train=False, worldType=1, animate=False)
-        if len(eval_world.colony) > 1:
-            eval_world.colony[1].q_agent = eval_agent
-        rewards = []
-        lengths = []
-        deliveries = []
-        eval_episodes = 50
-        for _ in range(eval_episodes):
-            eval_world.reset()
-            if len(eval_world.colony) > 1:
-                eval_world.colony[1].q_agent = eval_agent
-            start_food = getattr(eval_world.colony[0], "food", 0) if len(eval_world.colony) > 0 else 0
-            total_reward = 0
-            steps = 0
-            terminated = False
-            truncated = False
-            while not (terminated or truncated) and steps < max_steps:
-                _, r, terminated, truncated, _ = eval_world.step(None)
-                if r is not None:
-                    total_reward += r
-                steps += 1
-            end_food = getattr(eval_world.colony[0], "food", 0) if len(eval_world.colony) > 0 else 0
-            rewards.append(total_reward)
-            lengths.append(steps)
-            deliveries.append(max(0, end_food - start_food))
-        return np.mean(rewards), np.mean(lengths), np.mean(deliveries)
-
-    # Reuse the same lr/gamma from train_agent defaults
-    learning_rate = 0.1
-    discount_factor = 0.9
-    q_eval = greedy_eval(QLearningAgent, q_agent.q_table)
-    d_eval = greedy_eval(DynaQAgent, dyna_agent.q_table)
-    s_eval = greedy_eval(SARSAAgent, sarsa_agent.q_table) if include_sarsa else None
-    print("Greedy eval (50 eps):")
-    print(f"  Q-learning:    avg_reward={q_eval[0]:.2f}, avg_steps={q_eval[1]:.1f}, avg_deliveries={q_eval[2]:.2f}")
-    print(f"  Dyna-Q({planning_steps}): avg_reward={d_eval[0]:.2f}, avg_steps={d_eval[1]:.1f}, avg_deliveries={d_eval[2]:.2f}")
-    if s_eval:
-        print(f"  SARSA:         avg_reward={s_eval[0]:.2f}, avg_steps={s_eval[1]:.1f}, avg_deliveries={s_eval[2]:.2f}")
+    plt.close(fig)
+
+    # Greedy eval summary, mean over seeds with its confidence interval
+    print(f"Greedy eval (50 eps, {n_seeds} seed(s)):")
+    for name, label, _, _ in algos:
+        parts = []
+        for metric, fmt in (("eval_avg_reward", ".2f"), ("eval_avg_steps", ".1f"), ("eval_avg_deliveries", ".2f")):
+            values = np.array([[run["summary"][metric]] for run in runs[name]])
+            mean, low, high = bootstrap_ci(values, seed=0)
+            ci = f" [{low[0]:{fmt}}, {high[0]:{fmt}}]" if n_seeds > 1 else ""
+            parts.append(f"{metric[len('eval_'):]}={mean[0]:{fmt}}{ci}")
+        print(f"  {label + ':':<14} " + ", ".join(parts))
+    print(f"  {'Optimal (DP):':<14} reward={optimal_reward:.2f}, steps={optimal_steps:.1f}")
+    return runs
 
 
 def compare_q_vs_dyna_suite(
@@ -370,14 +487,20 @@ def compare_q_vs_dyna_suite(
     smooth_window: int = 50,
     seed: Optional[int] = 42,
     timestamped: bool = False,
+    store: Optional[ResultStore] = None,
+    n_seeds: int = 5,
+    workers: Optional[int] = None,
 ) -> None:
     """
     Run multiple compare_q_vs_dyna configurations (planning_depth x epsilon schedule) and save separate plots.
     Each comparison includes Q-learning, Dyna-Q, and SARSA.
+    Every training run is stored as it finishes, a rerun only trains what is missing.
     """
     base_dir = os.path.join("results", "comparisons")
+    if store is None:
+        store = ResultStore(os.path.join(base_dir, "store"))
     if timestamped:
-        base_dir = os.path.join(base_dir, datetime.now().strftime("%Y%m%d_%H%M%S"))
+        base_dir = os.path.join(base_dir, datetime.datetime.now().strftime("%Y%m%d_%H%M%S"))
     os.makedirs(base_dir, exist_ok=True)
     for ps in planning_steps_list:
         for eps in epsilon_list:
@@ -398,6 +521,9 @@ def compare_q_vs_dyna_suite(
                     seed=seed,
                     output_path=outfile,
                     timestamped=False,
+                    store=store,
+                    n_seeds=n_seeds,
+                    workers=workers,
                 )
 
 
@@ -10,17 +10,31 @@ import sys
 import os
 import itertools
 import csv
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from typing import List, Tuple
 
 # Add src directory to Python path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-import matplotlib.pyplot as plt
+import numpy as np
 from hex_grid_world import HexGridWorld
 from q_learning import QLearningAgent
 from dyna_q import DynaQAgent
 from sarsa import SARSAAgent
+from event_log import EventLog, INFO
+from engine import Engine, ProgressLog
+from profiling import ProfileEpisodes
+from result_store import ResultStore
+from eval_service import EvalService, compilePolicy
+from batched_eval import BatchedEval
+from metrics_store import MetricsStore, MetricsRecorder
+from confidence import bootstrap_ci
+
+# Names of the summary fields of a combination in the order run_combo returns them, and of the per-episode columns it writes
+RESULT_FIELDS = ['algo', 'lr', 'gamma', 'epsilon', 'eps_decay', 'train_avg_last50', 'train_avg_steps', 'train_avg_deliveries', 'eval_avg_reward', 'eval_avg_steps', 'eval_avg_deliveries']
+SERIES_FIELDS = ['episode_rewards', 'episode_lengths', 'episode_deliveries', 'eval_rewards', 'eval_lengths', 'eval_deliveries']
 
 
 def train_agent(
@@ -31,84 +45,67 @@ def train_agent(
     epsilon: float,
     epsilon_decay: float,
     episodes: int = 200,
-    animate: bool = False
+    animate: bool = False,
+    log: EventLog = None,
+    seed: int = None,
+    agent: object = None,
+    callbacks: list = None,
+    profile: bool = False,
+    history: int = None
 ) -> Tuple[List[int], List[int], List[int], object, object]:
+    # Passing in an already trained agent continues its training, epsilon included
+    # With history, only about that many recent episodes come back, stream the rest to a metrics store through a callback
     min_epsilon = 0.01
     algo_label = agent_cls.__name__
+    if log is None:
+        log = EventLog(level=INFO, echo=True)
 
-    world = HexGridWorld(train=True, worldType=1, animate=animate)
+    world = HexGridWorld(train=True, worldType=1, animate=animate, log=log, seed=seed)
 
     # Create Q-learning agent with hyperparameters
-    q_agent = None
-    if len(world.colony) > 1:
+    q_agent = agent
+    if q_agent is None:
         q_agent = agent_cls(
             learning_rate=learning_rate,
             discount_factor=discount_factor,
             epsilon=epsilon,
             epsilon_decay=epsilon_decay,
             min_epsilon=min_epsilon,
+            seed=seed,
             **agent_kwargs,
         )
-        world.colony[1].q_agent = q_agent
-
-    episode_rewards = []
-    episode_lengths = []
-    episode_deliveries = []
-
-    print(f"Training with {algo_label}: lr={learning_rate}, γ={discount_factor}, ε={epsilon}, ε_decay={epsilon_decay}")
-
-    for episode in range(episodes):
-        world.reset()
-        start_food = 0
-        if len(world.colony) > 0:
-            start_food = getattr(world.colony[0], 'food', 0)
-
-        # Reassign Q-agent after reset (Q-table persists across episodes)
-        if len(world.colony) > 1:
-            if q_agent is None:
-                q_agent = agent_cls(
-                    learning_rate=learning_rate,
-                    discount_factor=discount_factor,
-                    epsilon=epsilon,
-                    epsilon_decay=epsilon_decay,
-                    min_epsilon=min_epsilon,
-                    **agent_kwargs,
-                )
-            world.colony[1].q_agent = q_agent
-
-        total_reward = 0
-        steps = 0
-        terminated = False
-        truncated = False
-
-        while not (terminated or truncated) and steps < 1000:
-            # Q-learning agent selects action internally with Worker.act() so we pass None as action since Worker.act() will use the Q-learning agent to determine the action
-            _, reward, terminated, truncated, _ = world.step(None)
-
-            if reward is not None:
-                total_reward += reward
-            steps += 1
-
-        # Decay epsilon after each episode
-        if q_agent is not None:
-            q_agent.decay_epsilon()
-
-        episode_rewards.append(total_reward)
-        episode_lengths.append(steps)
-        end_food = 0
-        if len(world.colony) > 0:
-            end_food = getattr(world.colony[0], 'food', 0)
-        episode_deliveries.append(max(0, end_food - start_food))
-
-        if episode % 100 == 0:
-            avg_reward = sum(episode_rewards[-100:]) / min(100, len(episode_rewards))
-            avg_length = sum(episode_lengths[-100:]) / min(100, len(episode_lengths))
-            current_epsilon = q_agent.epsilon if q_agent else epsilon
-            print(f"Episode {episode}: Avg Reward = {avg_reward:.2f}, Avg Length = {avg_length:.2f}, ε = {current_epsilon:.3f}")
+
+    log.emit(
+        INFO,
+        "train_start",
+        msg=f"Training with {algo_label}: lr={learning_rate}, γ={discount_factor}, ε={epsilon}, ε_decay={epsilon_decay}",
+        agent=algo_label,
+        lr=learning_rate,
+        gamma=discount_factor,
+        epsilon=epsilon,
+        epsilon_decay=epsilon_decay,
+    )
+
+    # Q-learning agent selects action internally with Worker.act(), the engine reattaches it after every reset
+    progress = ProgressLog(log, epsilon=epsilon)
+    callbacks = [progress] + list(callbacks or [])
+    # Per-phase step timing, summarized in the log at the end
+    if profile:
+        callbacks.append(ProfileEpisodes(log=log))
+    engine = Engine(world, q_agent, maxSteps=1000, callbacks=callbacks, history=history).run(episodes)
+    episode_rewards = engine.rewards
+    episode_lengths = engine.lengths
+    episode_deliveries = engine.deliveries
 
     return episode_rewards, episode_lengths, episode_deliveries, q_agent, world
 
 
+# Pool worker setup, they only ever save plots to files
+def use_agg_backend() -> None:
+    import matplotlib
+    matplotlib.use("Agg")
+
+
 def plot_training_results(
     episode_rewards: List[int],
     episode_lengths: List[int],
@@ -120,16 +117,26 @@ def plot_training_results(
 ) -> None:
     """
     Plot training results with specified hyperparameters in title.
+    Series can also be (seeds, episodes) arrays, then the mean is drawn with a shaded 95% bootstrap confidence band.
     """
+    # Loaded here so sweep workers only pay for matplotlib once they plot
+    import matplotlib.pyplot as plt
     _, (ax1, ax2) = plt.subplots(2, 1, figsize=(10, 8))
 
-    ax1.plot(episode_rewards)
+    def plot_series(ax, series):
+        runs = np.atleast_2d(np.asarray(series, dtype=float))
+        mean, low, high = bootstrap_ci(runs, seed=0)
+        line, = ax.plot(mean)
+        if len(runs) > 1:
+            ax.fill_between(range(len(mean)), low, high, color=line.get_color(), alpha=0.3)
+
+    plot_series(ax1, episode_rewards)
     ax1.set_title(f'Training Rewards Over Episodes (lr={learning_rate}, ε={epsilon}, γ={discount_factor}, ε_decay={epsilon_decay})')
     ax1.set_xlabel('Episode')
     ax1.set_ylabel('Total Reward')
     ax1.grid(True)
 
-    ax2.plot(episode_lengths)
+    plot_series(ax2, episode_lengths)
     ax2.set_title('Episode Lengths Over Episodes')
     ax2.set_xlabel('Episode')
     ax2.set_ylabel('Steps')
@@ -146,12 +153,99 @@ def plot_training_results(
         plt.show()
 
 
-def main(timestamped: bool = False) -> None:
+# Train, plot and evaluate one combination of the sweep
+# Top level so the process pool can run it, every combination gets its own world and seeded random sources
+# Per-episode columns are streamed to the metrics store under `key` while the run goes, only the summary comes back
+# The run is registered by whoever stores the summary, so parallel workers never write the index
+def run_combo(combo: tuple, episodes: int, run_dir: str, metrics: MetricsStore, key: str, seed: int = None, log: EventLog = None, eval_episodes: int = 50, plot: bool = True, eval_workers: int = 1) -> tuple:
+    (algo_name, agent_cls, agent_kwargs), lr, gamma, eps, eps_decay = combo
+    if seed is not None:
+        random.seed(seed)
+    if log is None:
+        log = EventLog(level=INFO, echo=True)
+
+    with metrics.writer(key) as writer:
+        # The engine keeps enough episodes for the last-50 average, the rest are only on disk
+        episode_rewards, _, _, q_agent, world = train_agent(
+            agent_cls=agent_cls,
+            agent_kwargs=agent_kwargs,
+            learning_rate=lr,
+            discount_factor=gamma,
+            epsilon=eps,
+            epsilon_decay=eps_decay,
+            episodes=episodes,
+            animate=False,
+            log=log,
+            seed=seed,
+            callbacks=[MetricsRecorder(writer)],
+            history=50
+        )
+
+        # avg_last50: Average reward over the last 50 training episodes to determine final performance
+        avg_last50 = sum(episode_rewards[-50:]) / min(50, len(episode_rewards))
+        avg_steps = metrics.mean(key, 'episode_lengths')
+        avg_deliveries = metrics.mean(key, 'episode_deliveries')
+
+        # Save per-combo training plot
+        combo_name = f"{algo_name}_lr{lr}_g{gamma}_e{eps}_d{eps_decay}".replace('.', 'p')
+        train_plot_path = os.path.join(run_dir, f"train_{combo_name}.png")
+        if plot:
+            plot_training_results(metrics.column(key, 'episode_rewards'), metrics.column(key, 'episode_lengths'), learning_rate=lr, discount_factor=gamma, epsilon=eps, epsilon_decay=eps_decay, save_path=train_plot_path)
+
+        # Evaluate the frozen greedy policy in the full environment (train=False)
+        # Deterministic results come from the shared cache when the same policy was already evaluated
+        with EvalService(workers=eval_workers, store=ResultStore(os.path.join("results", "eval_cache"))) as service:
+            eval_rewards, eval_lengths, eval_deliveries = service.evaluate(q_agent.q_table, worldType=1, maxSteps=1000, episodes=eval_episodes, seed=seed, nActions=q_agent.n_actions, interner=q_agent.interner)
+        for column, values in zip(SERIES_FIELDS[3:], (eval_rewards, eval_lengths, eval_deliveries)):
+            writer.extend(column, values)
+
+    avg_eval_reward = sum(eval_rewards) / len(eval_rewards)
+    avg_eval_steps = sum(eval_lengths) / len(eval_lengths)
+    avg_eval_deliveries = sum(eval_deliveries) / len(eval_deliveries)
+
+    return (algo_name, lr, gamma, eps, eps_decay, avg_last50, avg_steps, avg_deliveries, avg_eval_reward, avg_eval_steps, avg_eval_deliveries)
+
+
+# Everything that decides a combination's results, the key it's stored under
+def combo_config(combo: tuple, episodes: int, seed: int = None, eval_episodes: int = 50) -> dict:
+    (algo_name, agent_cls, agent_kwargs), lr, gamma, eps, eps_decay = combo
+    return {
+        "run": "hyperparameter_sweep",
+        "algo": algo_name,
+        "agent": agent_cls.__name__,
+        "agent_kwargs": agent_kwargs,
+        "lr": lr,
+        "gamma": gamma,
+        "epsilon": eps,
+        "eps_decay": eps_decay,
+        "episodes": episodes,
+        "eval_episodes": eval_episodes,
+        "eval": "frozen_greedy",
+        "seed": seed,
+    }
+
+
+# Store a finished combination: the summary in the result store, and register the columns run_combo wrote to the metrics store under the same key
+def store_combo(store: ResultStore, metrics: MetricsStore, config: dict, result: tuple) -> tuple:
+    metrics.register(store.key(config), config)
+    store.put(config, dict(zip(RESULT_FIELDS, result)), {})
+    return result
+
+
+# Summary of a stored combination, None if it has to run (again), also when its columns are missing from the metrics store
+def load_combo(store: ResultStore, metrics: MetricsStore, config: dict) -> tuple:
+    entry = store.get(config)
+    if entry is None or not metrics.has(store.key(config)):
+        return None
+    return tuple(entry["summary"][field] for field in RESULT_FIELDS)
+
+
+# The sweep's grid, every (algo, lr, gamma, epsilon, eps_decay)
+def sweep_combos() -> list:
     lrs = [0.001, 0.01]
     gammas = [0.9, 0.99]
     epsilons = [0.3, 0.5]
     eps_decays = [0.99, 0.995]
-    episodes = 300
 
     algos = [
         ("q_learning", QLearningAgent, {}),
@@ -160,8 +254,120 @@ def main(timestamped: bool = False) -> None:
         ("dyna_q_p5", DynaQAgent, {"planning_steps": 5}),
     ]
 
-    combos = list(itertools.product(algos, lrs, gammas, epsilons, eps_decays))
-    print(f"Starting hyperparameter search: {len(combos)} combinations, {episodes} episodes each\n")
+    return list(itertools.product(algos, lrs, gammas, epsilons, eps_decays))
+
+
+# Train one combination for a few more episodes, starting from its checkpointed agent if it has one
+# Top level so the process pool can run it, the agent travels back and forth pickled
+def train_segment(combo: tuple, agent: object, episodes: int, seed: int = None) -> Tuple[List[int], List[int], List[int], object]:
+    (_, agent_cls, agent_kwargs), lr, gamma, eps, eps_decay = combo
+    if seed is not None:
+        random.seed(seed)
+    episode_rewards, episode_lengths, episode_deliveries, q_agent, _ = train_agent(
+        agent_cls=agent_cls,
+        agent_kwargs=agent_kwargs,
+        learning_rate=lr,
+        discount_factor=gamma,
+        epsilon=eps,
+        epsilon_decay=eps_decay,
+        episodes=episodes,
+        log=EventLog(),
+        seed=seed,
+        agent=agent,
+    )
+    return episode_rewards, episode_lengths, episode_deliveries, q_agent
+
+
+def successive_halving(
+    combos: list = None,
+    min_episodes: int = 50,
+    max_episodes: int = 300,
+    eta: int = 2,
+    metric: str = "reward",
+    window: int = 50,
+    workers: int = None,
+    seed: int = 42,
+    eval_episodes: int = 0,
+) -> list:
+    """
+    Successive halving over the sweep's grid.
+    Trains every combination for min_episodes, keeps the best 1/eta by the rolling mean of the last `window` episodes
+    (metric "reward" or "deliveries"), and continues the survivors from their agents for eta times the budget,
+    until the budget reaches max_episodes or one combination is left.
+    Returns (combo, score, episodes trained, rewards, lengths, deliveries) for every combination, best first.
+    With eval_episodes, every combination's final agent is also evaluated greedily, all of them in one batched run,
+    and each tuple gets the (eval reward, eval steps, eval deliveries) means on the end.
+    """
+    if combos is None:
+        combos = sweep_combos()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    series_index = {"reward": 0, "deliveries": 2}[metric]
+
+    # Per combination: agent checkpoint, episodes trained and the training series so far
+    agents = [None] * len(combos)
+    trained = [0] * len(combos)
+    history = [([], [], []) for _ in combos]
+
+    def score(i: int) -> float:
+        values = history[i][series_index][-window:]
+        return sum(values) / len(values)
+
+    alive = list(range(len(combos)))
+    budget = min_episodes
+    total = 0
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        while True:
+            # Bring every survivor up to the rung's budget, each segment with its own seed
+            jobs = {i: (combos[i], agents[i], budget - trained[i], None if seed is None else seed + i * 100003 + trained[i]) for i in alive}
+            if pool is None:
+                done = {i: train_segment(*job) for i, job in jobs.items()}
+            else:
+                futures = {pool.submit(train_segment, *job): i for i, job in jobs.items()}
+                done = {futures[future]: future.result() for future in as_completed(futures)}
+            for i, (rewards, lengths, deliveries, agent) in done.items():
+                for series, new in zip(history[i], (rewards, lengths, deliveries)):
+                    series.extend(new)
+                agents[i] = agent
+                total += budget - trained[i]
+                trained[i] = budget
+            alive.sort(key=score, reverse=True)
+            print(f"Rung at {budget} episodes: {len(alive)} combinations, best {combos[alive[0]][0][0]} lr={combos[alive[0]][1]} gamma={combos[alive[0]][2]} eps={combos[alive[0]][3]} decay={combos[alive[0]][4]} ({metric} {score(alive[0]):.2f})")
+            if budget >= max_episodes or len(alive) == 1:
+                break
+            alive = alive[:max(1, len(alive) // eta)]
+            budget = min(budget * eta, max_episodes)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    print(f"Trained {total} episodes in total, a full sweep takes {len(combos) * max_episodes}")
+    # Longest trained first, then by score
+    order = sorted(range(len(combos)), key=lambda i: (trained[i], score(i)), reverse=True)
+    if eval_episodes <= 0:
+        return [(combos[i], score(i), trained[i]) + history[i] for i in order]
+    evaluated = evaluate_agents(agents, eval_episodes, seed=seed)
+    return [(combos[i], score(i), trained[i]) + history[i] + (evaluated[i],) for i in order]
+
+
+def evaluate_agents(agents: list, eval_episodes: int = 50, max_steps: int = 1000, seed: int = None) -> List[Tuple[float, float, float]]:
+    """
+    Greedy evaluation of many trained agents on presetWorld1 at once, every policy and episode in one batched simulation.
+    Returns (mean reward, mean steps, mean deliveries) per agent.
+    """
+    policies = [compilePolicy(agent.q_table, agent.n_actions, agent.interner) for agent in agents]
+    out = BatchedEval(HexGridWorld(train=False, worldType=1)).run(policies, episodes=eval_episodes, maxSteps=max_steps, seed=seed)
+    return [(float(out["rewards"][i].mean()), float(out["lengths"][i].mean()), float(out["deliveries"][i].mean())) for i in range(len(agents))]
+
+
+def main(timestamped: bool = False, workers: int = None, seed: int = 42, store: ResultStore = None, n_seeds: int = 1, metrics: MetricsStore = None) -> None:
+    episodes = 300
+    combos = sweep_combos()
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, min(workers, len(combos) * n_seeds))
+    print(f"Starting hyperparameter search: {len(combos)} combinations x {n_seeds} seed(s), {episodes} episodes each, {workers} worker(s)\n")
 
     # Directory to store results; timestamped if requested
     if timestamped:
@@ -170,85 +376,57 @@ def main(timestamped: bool = False) -> None:
     else:
         run_dir = os.path.join("results", "hyperparameter_sweeps")
     os.makedirs(run_dir, exist_ok=True)
-    results = []
-    all_training_data = []
-
-    # Run all experiments and collect full training data
-    for i, combo in enumerate(combos, 1):
-        (algo_name, agent_cls, agent_kwargs), lr, gamma, eps, eps_decay = combo
-        print(f"[{i}/{len(combos)}] Testing algo={algo_name}, lr={lr}, gamma={gamma}, eps={eps}, eps_decay={eps_decay}")
 
-        episode_rewards, episode_lengths, episode_deliveries, q_agent, world = train_agent(
-            agent_cls=agent_cls,
-            agent_kwargs=agent_kwargs,
-            learning_rate=lr,
-            discount_factor=gamma,
-            epsilon=eps,
-            epsilon_decay=eps_decay,
-            episodes=episodes,
-            animate=False
-        )
-        
-        # avg_last50: Average reward over the last 50 training episodes to determine final performance
-        avg_last50 = sum(episode_rewards[-50:]) / min(50, len(episode_rewards))
-        avg_steps = sum(episode_lengths) / len(episode_lengths)
-        avg_deliveries = sum(episode_deliveries) / len(episode_deliveries)
-        
-        # Save per-combo training plot
-        combo_name = f"{algo_name}_lr{lr}_g{gamma}_e{eps}_d{eps_decay}".replace('.', 'p')
-        train_plot_path = os.path.join(run_dir, f"train_{combo_name}.png")
-        plot_training_results(episode_rewards, episode_lengths, learning_rate=lr, discount_factor=gamma, epsilon=eps, epsilon_decay=eps_decay, save_path=train_plot_path)
+    # Every run gets its own seed off the sweep's, so results don't depend on the worker count
+    # The first seed of every combination is the same as in a single-seed sweep
+    def run_seed(i: int, k: int):
+        return None if seed is None else seed + i + k * len(combos)
+
+    runs = [(i, k) for i in range(len(combos)) for k in range(n_seeds)]
+
+    def report(run: tuple, done: int, result: tuple):
+        seed_note = f", seed {run[1] + 1}/{n_seeds}" if n_seeds > 1 else ""
+        print(f"[{done}/{len(runs)}] algo={result[0]}, lr={result[1]}, gamma={result[2]}, eps={result[3]}, eps_decay={result[4]}{seed_note}")
+        print(f"  -> train_avg_reward_last50={result[5]:.2f}, train_avg_steps={result[6]:.2f}, train_avg_deliveries={result[7]:.2f}, eval_avg_reward={result[8]:.2f}, eval_avg_steps={result[9]:.1f}, eval_avg_deliveries={result[10]:.2f}\n")
+
+    # Finished runs are kept outside any timestamped folder, so every rerun can pick them up
+    # Only summaries stay in memory, per-episode series go to the metrics store as runs finish
+    if store is None:
+        store = ResultStore(os.path.join("results", "hyperparameter_sweeps", "store"))
+    if metrics is None:
+        metrics = MetricsStore(os.path.join("results", "hyperparameter_sweeps", "metrics"))
+    configs = {(i, k): combo_config(combos[i], episodes, run_seed(i, k)) for i, k in runs}
+    finished = {}
+    for run in runs:
+        result = load_combo(store, metrics, configs[run])
+        if result is not None:
+            finished[run] = result
+    pending = [run for run in runs if run not in finished]
+    if len(finished) > 0:
+        print(f"Resuming: {len(finished)} runs already stored, {len(pending)} to run\n")
+
+    # Run the rest, kept in order however they finish
+    # Each one is stored as soon as it's done, only the first seed saves a per-combo plot
+    if workers == 1:
+        for i, k in pending:
+            finished[(i, k)] = store_combo(store, metrics, configs[(i, k)], run_combo(combos[i], episodes, run_dir, metrics, store.key(configs[(i, k)]), run_seed(i, k), plot=k == 0))
+            report((i, k), len(finished), finished[(i, k)])
+    elif len(pending) > 0:
+        # Workers stay quiet and only save plots to files, the progress lines come from here as runs finish
+        quiet = EventLog()
+        with ProcessPoolExecutor(max_workers=workers, initializer=use_agg_backend) as pool:
+            futures = {pool.submit(run_combo, combos[i], episodes, run_dir, metrics, store.key(configs[(i, k)]), run_seed(i, k), quiet, plot=k == 0): (i, k) for i, k in pending}
+            for future in as_completed(futures):
+                run = futures[future]
+                finished[run] = store_combo(store, metrics, configs[run], future.result())
+                report(run, len(finished), finished[run])
+
+    # Average every combination over its seeds, the CSV holds the means
+    results = []
+    for i in range(len(combos)):
+        per_seed = [finished[(i, k)] for k in range(n_seeds)]
+        results.append(per_seed[0][:5] + tuple(float(np.mean([r[j] for r in per_seed])) for j in range(5, len(RESULT_FIELDS))))
 
-        # Evaluate policy in full environment (train=False)
-        eval_episodes = 50
-        # Create a fresh copy of the Q-agent for evaluation and set epsilon to 0 for deterministic greedy policy
-        eval_agent = agent_cls(
-            learning_rate=lr,
-            discount_factor=gamma,
-            epsilon=0.0,
-            epsilon_decay=eps_decay,
-            min_epsilon=0.01,
-            **agent_kwargs,
-        )
-        # Copy trained Q-table to eval agent
-        eval_agent.q_table = dict(q_agent.q_table)
-        world.train = False
-        world.colony[1].q_agent = eval_agent
-        eval_rewards = []
-        eval_lengths = []
-        eval_deliveries = []
-        for e in range(eval_episodes):
-            world.reset()
-            # Reset recreates the colony, reattach the frozen eval agent to worker[1]
-            if len(world.colony) > 1:
-                world.colony[1].q_agent = eval_agent
-            start_food = getattr(world.colony[0], 'food', 0) if len(world.colony) > 0 else 0
-            total_reward = 0
-            steps = 0
-            terminated = False
-            truncated = False
-            while not (terminated or truncated) and steps < 1000:
-                s_, r, terminated, truncated, _ = world.step(None)
-                if r is not None:
-                    total_reward += r
-                steps += 1
-            end_food = getattr(world.colony[0], 'food', 0) if len(world.colony) > 0 else 0
-            eval_rewards.append(total_reward)
-            eval_lengths.append(steps)
-            eval_deliveries.append(max(0, end_food - start_food))
-        # Restore world to training mode
-        world.train = True
-        world.colony[1].q_agent = q_agent
-
-        avg_eval_reward = sum(eval_rewards) / len(eval_rewards)
-        avg_eval_steps = sum(eval_lengths) / len(eval_lengths)
-        avg_eval_deliveries = sum(eval_deliveries) / len(eval_deliveries)
-
-        results.append((algo_name, lr, gamma, eps, eps_decay, avg_last50, avg_steps, avg_deliveries, avg_eval_reward, avg_eval_steps, avg_eval_deliveries))
-        all_training_data.append((algo_name, lr, gamma, eps, eps_decay, episode_rewards, episode_lengths, episode_deliveries, eval_rewards, eval_lengths, eval_deliveries))
-
-        print(f"  -> train_avg_reward_last50={avg_last50:.2f}, train_avg_steps={avg_steps:.2f}, train_avg_deliveries={avg_deliveries:.2f}, eval_avg_reward={avg_eval_reward:.2f}, eval_avg_steps={avg_eval_steps:.1f}, eval_avg_deliveries={avg_eval_deliveries:.2f}\n")
-    
     # Find best configuration
     # Choose best configuration from the results of train_avg_last50
     best_idx = max(range(len(results)), key=lambda i: results[i][5])
@@ -264,13 +442,17 @@ def main(timestamped: bool = False) -> None:
     csv_path = os.path.join(run_dir, 'hyperparameter_results.csv')
     with open(csv_path, 'w', newline='') as f:
         writer = csv.writer(f)
-        writer.writerow(['algo', 'lr', 'gamma', 'epsilon', 'eps_decay', 'train_avg_last50', 'train_avg_steps', 'train_avg_deliveries', 'eval_avg_reward', 'eval_avg_steps', 'eval_avg_deliveries'])
+        writer.writerow(RESULT_FIELDS)
         writer.writerows(results)
     print(f"CSV saved: {csv_path}")
 
     # Generate graph for best configuration
     print(f"\nGenerating training graph for best configuration...")
-    best_episode_rewards, best_episode_lengths = all_training_data[best_idx][5], all_training_data[best_idx][6]
+    # Only the best combination's series are read back, one row per seed
+    best_keys = [store.key(configs[(best_idx, k)]) for k in range(n_seeds)]
+    best_episode_rewards, best_episode_lengths = metrics.stack(best_keys, 'episode_rewards'), metrics.stack(best_keys, 'episode_lengths')
+    best_eval_rewards = metrics.stack(best_keys, 'eval_rewards')
+    best_eval_lengths = metrics.stack(best_keys, 'eval_lengths')
 
     graph_path = os.path.join(run_dir, f'{best_algo}_training_hyperparameters_results.png')
     plot_training_results(
@@ -282,8 +464,6 @@ def main(timestamped: bool = False) -> None:
         epsilon_decay=best_eps_decay,
         save_path=graph_path
     )
-    best_eval_rewards = all_training_data[best_idx][8]
-    best_eval_lengths = all_training_data[best_idx][9]
     eval_graph_path = os.path.join(run_dir, f'{best_algo}_training_hyperparameter_evaluation_results.png')
     plot_training_results(
         best_eval_rewards,